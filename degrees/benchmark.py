@@ -0,0 +1,254 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+import degrees
+from graph import CompactGraph
+from search import bidirectional_search
+from util import Node, StackFrontier, QueueFrontier, DequeStackFrontier, DequeQueueFrontier
+
+FRONTIERS = {
+    "StackFrontier": StackFrontier,
+    "QueueFrontier": QueueFrontier,
+    "DequeStackFrontier": DequeStackFrontier,
+    "DequeQueueFrontier": DequeQueueFrontier,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for degrees.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    frontiers = commands.add_parser("frontiers", help="compare frontier implementations")
+    frontiers.add_argument("--sizes", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6])
+    frontiers.add_argument("--budget", type=float, default=30,
+                           help="skip runs expected to take longer than this many seconds")
+
+    memory = commands.add_parser("memory", help="compare the dict and compact data models")
+    memory.add_argument("directory")
+
+    parallel = commands.add_parser("parallel", help="measure query throughput across worker counts")
+    parallel.add_argument("directory")
+    parallel.add_argument("--queries", type=int, default=200)
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parallel.add_argument("--seed", type=int, default=0)
+
+    expansion = commands.add_parser("expansion", help="compare eager and lazy neighbor expansion")
+    expansion.add_argument("directory")
+    expansion.add_argument("--queries", type=int, default=100)
+    expansion.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "frontiers":
+        benchmark_frontiers(args.sizes, args.budget)
+    elif args.command == "memory":
+        benchmark_memory(args.directory)
+    elif args.command == "parallel":
+        benchmark_parallel(args.directory, args.queries, args.workers, args.seed)
+    elif args.command == "expansion":
+        benchmark_expansion(args.directory, args.queries, args.seed)
+
+
+def frontier_workload(frontier, n):
+    """
+    Run a BFS-shaped workload of `n` nodes through `frontier`:
+    every node is checked with contains_state before it is added,
+    and then the frontier is drained.
+    """
+    for state in range(n):
+        if not frontier.contains_state(state):
+            frontier.add(Node(state=state, parent=None, action=None))
+    while not frontier.empty():
+        frontier.remove()
+
+
+def benchmark_frontiers(sizes, budget):
+    """
+    Time every frontier implementation at each size in `sizes`.
+    The list-backed frontiers are quadratic, so sizes they cannot
+    finish within `budget` seconds are reported as skipped.
+    """
+    print(f"{'frontier':<20} {'nodes':>9} {'seconds':>10} {'nodes/sec':>12}")
+    for name, frontier_class in FRONTIERS.items():
+        growth = 2 if frontier_class in (StackFrontier, QueueFrontier) else 1
+        previous = None
+        for n in sorted(sizes):
+            if previous is not None:
+                last_n, last_seconds = previous
+                if last_seconds * (n / last_n) ** growth > budget:
+                    print(f"{name:<20} {n:>9} {'skipped':>10} {'':>12}")
+                    continue
+            start = time.perf_counter()
+            frontier_workload(frontier_class(), n)
+            seconds = time.perf_counter() - start
+            previous = (n, seconds)
+            print(f"{name:<20} {n:>9} {seconds:>10.4f} {n / seconds:>12.0f}")
+
+
+def measure(load):
+    """
+    Returns (seconds, bytes allocated) for calling `load`,
+    keeping whatever it returns alive while measuring.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    seconds = time.perf_counter() - start
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return seconds, allocated
+
+
+def benchmark_memory(directory):
+    """
+    Report load time and memory per edge of the dict model built by
+    degrees.load_data and of the CompactGraph for `directory`.
+    """
+    graph = CompactGraph.from_csv(directory)
+    edges = graph.edge_count()
+    del graph
+
+    def load_dicts():
+        degrees.load_data(directory)
+        return degrees.names, degrees.people, degrees.movies
+
+    print(f"{edges} edges")
+    print(f"{'model':<8} {'seconds':>10} {'bytes':>14} {'bytes/edge':>12}")
+    for name, load in [("dict", load_dicts), ("compact", lambda: CompactGraph.from_csv(directory))]:
+        seconds, allocated = measure(load)
+        print(f"{name:<8} {seconds:>10.2f} {allocated:>14} {allocated / max(edges, 1):>12.1f}")
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+
+
+def benchmark_parallel(directory, queries, workers, seed):
+    """
+    Time `queries` random shortest-path queries, each with a distinct
+    source, through degrees.map_paths at every worker count.
+    """
+    degrees.load_compact_data(directory)
+    graph = degrees.graph
+    rng = random.Random(seed)
+    count = len(graph.person_ids)
+    groups = {}
+    while len(groups) < min(queries, count):
+        groups[graph.person_ids[rng.randrange(count)]] = [graph.person_ids[rng.randrange(count)]]
+    groups = list(groups.items())
+
+    print(f"{'workers':>7} {'seconds':>10} {'queries/sec':>12} {'speedup':>8}")
+    baseline = None
+    for n in workers:
+        start = time.perf_counter()
+        for _ in degrees.map_paths(groups, n, directory):
+            pass
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"{n:>7} {seconds:>10.2f} {len(groups) / seconds:>12.1f} {baseline / seconds:>8.2f}")
+
+
+def eager_bidirectional_search(source, target, neighbors):
+    """
+    Bidirectional search expanding people through a `neighbors` function
+    that materializes every (movie_id, person_id) pair, as degrees did
+    before neighbors were generated lazily. Kept as a baseline, so it
+    only returns the person where the two sides met.
+    """
+    if source == target:
+        return []
+    forward, backward = {source: None}, {target: None}
+    forward_layer, backward_layer = [source], [target]
+    while forward_layer and backward_layer:
+        expand_forward = len(forward_layer) <= len(backward_layer)
+        layer, parents, other = (
+            (forward_layer, forward, backward) if expand_forward else (backward_layer, backward, forward)
+        )
+        meeting = None
+        next_layer = []
+        for person_id in layer:
+            for movie_id, neighbor in neighbors(person_id):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie_id, person_id)
+                next_layer.append(neighbor)
+                if neighbor in other and meeting is None:
+                    meeting = neighbor
+        if expand_forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+        if meeting is not None:
+            return meeting
+    return None
+
+
+def benchmark_expansion(directory, queries, seed):
+    """
+    Run `queries` random bidirectional searches over the dict model with
+    eager neighbor sets and with lazy expansion, reporting time, people
+    and movies expanded, (movie, person) pairs materialized and peak
+    memory allocated by tracemalloc during the searches.
+    """
+    degrees.load_data(directory)
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(queries)]
+
+    counts = {"people": 0, "movies": 0, "pairs": 0}
+
+    def counted_neighbors(person_id):
+        counts["people"] += 1
+        counts["movies"] += len(degrees.people[person_id]["movies"])
+        neighbors = degrees.neighbors_for_person(person_id)
+        counts["pairs"] += len(neighbors)
+        return neighbors
+
+    def counted_movies(person_id):
+        counts["people"] += 1
+        return degrees.movies_for_person(person_id)
+
+    def counted_stars(movie_id):
+        counts["movies"] += 1
+        return degrees.stars_for_movie(movie_id)
+
+    runs = {
+        "eager": (
+            lambda s, t: eager_bidirectional_search(s, t, degrees.neighbors_for_person),
+            lambda s, t: eager_bidirectional_search(s, t, counted_neighbors),
+        ),
+        "lazy": (
+            lambda s, t: bidirectional_search(s, t, degrees.movies_for_person, degrees.stars_for_movie),
+            lambda s, t: bidirectional_search(s, t, counted_movies, counted_stars),
+        ),
+    }
+
+    print(f"{queries} queries")
+    print(f"{'expansion':<10} {'seconds':>9} {'people':>10} {'movies':>10} {'pairs':>11} {'peak bytes':>12}")
+    for name, (run, counted) in runs.items():
+        start = time.perf_counter()
+        for s, t in pairs:
+            run(s, t)
+        seconds = time.perf_counter() - start
+
+        counts.update(people=0, movies=0, pairs=0)
+        for s, t in pairs:
+            counted(s, t)
+
+        peak = 0
+        for s, t in pairs:
+            tracemalloc.start()
+            run(s, t)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        print(f"{name:<10} {seconds:>9.3f} {counts['people']:>10} {counts['movies']:>10} "
+              f"{counts['pairs']:>11} {peak:>12}")
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+
+
+if __name__ == "__main__":
+    main()
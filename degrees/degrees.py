@@ -1,7 +1,18 @@
+import argparse
+import cProfile
 import csv
+import itertools
+import json
+import multiprocessing
 import sys
+import threading
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+from instrument import SearchStats, phase
+from landmarks import load_index
+from nameindex import DictNameIndex, GraphNameIndex, name_key
+from search import SEARCHES, paths_from
+from snapshot import load_graph
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +23,49 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed graph, used in place of the dictionaries above when loaded
+graph = None
+
+# LandmarkIndex over the compact graph, used to bound searches when loaded
+landmarks = None
+
+# NameIndex over whichever data model is loaded
+name_index = None
+
+# Whether every row of stars.csv has been added to the dictionaries above
+complete = True
+
+# Number of star rows read into the dictionaries above
+stars_loaded = 0
+
+# Held while the dictionaries above are changed or searched
+lock = threading.RLock()
+
+# Rows of stars.csv added at a time by load_stars
+STARS_CHUNK = 100000
+
+# Search strategy used by shortest_path, one of the keys of search.SEARCHES
+search = "bidirectional"
+
+# Whether answer_group collects SearchStats for each group of queries
+instrumented = False
+
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
     """
+    load_data_without_stars(directory)
+
+    # Load stars
+    for _ in load_stars(directory + "/stars.csv"):
+        pass
+
+
+def load_data_without_stars(directory):
+    """
+    Load people and movies from CSV files into memory.
+    """
     # Load people
     with open(directory + "/people.csv") as f:
         reader = csv.DictReader(f)
@@ -41,35 +90,219 @@ def load_data(directory):
                 "stars": set()
             }
 
-    # Load stars
-    with open(directory + "/stars.csv") as f:
+    global name_index
+    name_index = DictNameIndex(names, people)
+
+
+def load_stars(filename, chunk_size=STARS_CHUNK):
+    """
+    Add the rows of a stars CSV file to the people and movies already
+    loaded, `chunk_size` rows at a time, yielding the number of rows
+    read after each chunk so that queries can run on the partial data
+    in between. `complete` is False until the whole file has been added.
+    """
+    global complete, stars_loaded
+    complete = False
+    with open(filename) as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                break
+            with lock:
+                add_stars(rows)
+                stars_loaded += len(rows)
+
+                # Prefix matches are ranked by movie counts, which have changed
+                name_index.movie_counts = None
+            yield stars_loaded
+    complete = True
+
+
+def add_stars(rows):
+    """
+    Add (person_id, movie_id) rows to the people and movies dictionaries,
+    skipping rows for unknown people or movies.
+    """
+    for row in rows:
+        try:
+            people[row["person_id"]]["movies"].add(row["movie_id"])
+            movies[row["movie_id"]]["stars"].add(row["person_id"])
+        except KeyError:
+            pass
+
+
+def stream_data(directory):
+    """
+    Load people and movies, then keep loading stars.csv on a
+    background thread. Returns the thread.
+    """
+    global complete
+    load_data_without_stars(directory)
+    complete = False
+    thread = threading.Thread(target=_drain, args=(load_stars(directory + "/stars.csv"),), daemon=True)
+    thread.start()
+    return thread
+
+
+def append_stars(filename):
+    """
+    Add the rows of a further stars CSV file, such as a nightly delta,
+    without reloading anything already loaded.
+    """
+    for _ in load_stars(filename):
+        pass
+
+
+def _drain(iterator):
+    for _ in iterator:
+        pass
+
+
+def load_compact_data(directory, cache=True):
+    """
+    Load data into a CompactGraph, memory-mapping the binary snapshot
+    next to the CSV files when it is up to date and writing a fresh
+    one otherwise (unless `cache` is False).
+    """
+    global graph, name_index
+    graph = load_graph(directory, cache)
+    name_index = GraphNameIndex(graph)
+
+
+def load_landmarks(directory, count, cache=True):
+    """
+    Load (or build) the landmark index with `count` landmarks
+    for the compact graph.
+    """
+    global landmarks
+    landmarks = load_index(directory, graph, count, cache)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    global search, instrumented
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--search", choices=sorted(SEARCHES), default=search)
+    parser.add_argument("--graph", choices=["dict", "compact"], default="compact")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not write the snapshot")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer name pairs from a CSV file (- for stdin) as JSON lines")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes for batch queries")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="K",
+                        help="bound searches with distances from K landmark people")
+    parser.add_argument("--estimate", action="store_true",
+                        help="print landmark bounds on the degrees of separation instead of searching")
+    parser.add_argument("--stream", action="store_true",
+                        help="answer queries while stars.csv is still loading (dict graph only)")
+    parser.add_argument("--append", action="append", default=[], metavar="FILE",
+                        help="add the rows of another stars CSV file after loading (dict graph only)")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="write search counters and phase timings for each query as JSON lines")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write a cProfile dump of the run (of this process only, with --workers)")
+    args = parser.parse_args()
+    search = args.search
+    instrumented = args.stats is not None
+    if (args.landmarks or args.estimate) and args.graph != "compact":
+        parser.error("landmarks need the compact graph")
+    if args.estimate and not args.landmarks:
+        parser.error("--estimate needs --landmarks")
+    if (args.stream or args.append) and args.graph != "dict":
+        parser.error("--stream and --append need --graph dict")
+    if args.stream and args.workers > 1:
+        parser.error("--stream cannot be combined with --workers")
+
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    stats_file = open(args.stats, "w") if args.stats else None
+    try:
+        run(args, stats_file)
+    finally:
+        if stats_file is not None:
+            stats_file.close()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+
+
+def run(args, stats_file):
+    """
+    Load the data and answer the queries asked for by the command line
+    `args`, writing stats for each query to `stats_file` if given.
+    """
+    # Keep stdout for results in batch mode
+    log = sys.stderr if args.batch else sys.stdout
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=log)
+    start = time.perf_counter()
+    load_stats = SearchStats()
+    with load_stats.phase("load"):
+        if args.graph == "compact":
+            load_compact_data(args.directory, cache=not args.no_cache)
+        elif args.stream:
+            stream_data(args.directory)
+        else:
+            load_data(args.directory)
+        for filename in args.append:
+            append_stars(filename)
+    if args.stream:
+        print(f"People and movies loaded in {time.perf_counter() - start:.2f}s, stars still loading.", file=log)
+    else:
+        print(f"Data loaded in {time.perf_counter() - start:.2f}s.", file=log)
+    if graph is not None:
+        edges = graph.edge_count()
+        print(f"{graph.nbytes()} bytes for {edges} edges ({graph.nbytes() / max(edges, 1):.1f} bytes per edge).",
+              file=log)
+    if args.landmarks:
+        start = time.perf_counter()
+        with load_stats.phase("load"):
+            load_landmarks(args.directory, args.landmarks, cache=not args.no_cache)
+        print(f"Landmarks loaded in {time.perf_counter() - start:.2f}s.", file=log)
+    if stats_file is not None:
+        print(json.dumps({"event": "load", "phases": load_stats.phases}), file=stats_file, flush=True)
 
-    source = person_id_for_name(input("Name: "))
+    if args.batch:
+        f = sys.stdin if args.batch == "-" else open(args.batch, newline="")
+        with f:
+            for result in batch_query(read_pairs(f), args.workers, args.directory, not args.no_cache, instrumented):
+                stats = result.pop("stats", None)
+                if stats_file is not None and stats is not None:
+                    record = {"event": "query", "line": result["line"], "source": result["source"],
+                              "target": result["target"]}
+                    print(json.dumps(dict(record, **stats)), file=stats_file, flush=True)
+                print(json.dumps(result), flush=True)
+        return
+
+    stats = SearchStats() if stats_file is not None else None
+    source = person_id_for_name(input("Name: "), stats)
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = person_id_for_name(input("Name: "), stats)
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if args.estimate:
+        bounds = landmarks.estimate(source, target)
+        if bounds is None:
+            print("Not connected.")
+        elif bounds[1] is None:
+            print(f"At least {bounds[0]} degrees of separation.")
+        else:
+            print(f"Between {bounds[0]} and {bounds[1]} degrees of separation.")
+        return
+
+    searched_complete = complete
+    path = shortest_path(source, target, stats)
+    if not searched_complete:
+        print(f"Searched partial data ({stars_loaded} star rows loaded so far).")
+    if stats is not None:
+        record = {"event": "query", "source": source, "target": target}
+        print(json.dumps(dict(record, **stats.as_dict())), file=stats_file, flush=True)
 
     if path is None:
         print("Not connected.")
@@ -78,67 +311,228 @@ def main():
         print(str(degrees) + ' degrees of separation.')
         path = [(None, source)]  + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_for_id(path[i][1])["name"]
+            person2 = person_for_id(path[i + 1][1])["name"]
+            movie = movie_for_id(path[i + 1][0])["title"]
             print(str(i + 1) + ": " + person1 + " and " + person2 + " starred in " + movie)
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `stats`, if given, is an instrument.SearchStats that records
+    the work done by the search and how long it took.
     If no possible path, returns None.
     """
-    states_explored = 0
+    with phase(stats, "search"):
+        if landmarks is not None:
+            return landmarks.shortest_path(source, target, stats)
+        if graph is not None:
+            return graph.shortest_path(source, target, search, stats)
+        with lock:
+            return SEARCHES[search](source, target, movies_for_person, stars_for_movie, stats=stats)
 
-    intial = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier();
-    frontier.add(intial);
 
-    explored = set()
+def shortest_paths(source, targets, stats=None):
+    """
+    Returns a dictionary mapping each of `targets` to the shortest list
+    of (movie_id, person_id) pairs that connect the source to it,
+    or to None if it is not connected.
+
+    A single target is answered with shortest_path instead, since the
+    bidirectional search explores far less of the graph than a full
+    breadth-first search from the source.
+    """
+    if len(targets) == 1:
+        return {target: shortest_path(source, target, stats) for target in targets}
+    with phase(stats, "search"):
+        if graph is not None:
+            return graph.paths_from(source, targets, stats)
+        with lock:
+            return paths_from(source, targets, movies_for_person, stars_for_movie, stats)
+
+
+def read_pairs(f):
+    """
+    Yields (line, source name, target name) for each row of a CSV file
+    with two names per row, skipping blank rows.
+    """
+    for line, row in enumerate(csv.reader(f), 1):
+        if len(row) >= 2:
+            yield line, row[0].strip(), row[1].strip()
+
+
+def batch_query(pairs, workers=1, directory=None, cache=True, instrument=False):
+    """
+    Yields a result dictionary for each (line, source name, target name)
+    in `pairs`, in input order, running one breadth-first search per
+    distinct source for all of its targets.
+
+    With more than one worker the searches are spread across a pool of
+    processes that load the data from `directory`.
+
+    If `instrument` is True, each result also has "stats": the search
+    counters and phase timings of its query. Queries answered by the
+    same search share its counters, and "shared_by" says how many did.
+    """
+    results = []
+    queries_for_source = {}
+    for line, source_name, target_name in pairs:
+        result = {"line": line, "source": source_name, "target": target_name}
+        results.append(result)
+        stats = SearchStats() if instrument else None
+        with phase(stats, "lookup"):
+            source = resolve_name(source_name, result, "source")
+            target = resolve_name(target_name, result, "target")
+        if stats is not None:
+            result["stats"] = stats.as_dict()
+        if source is not None and target is not None:
+            # Group queries by source so each source is searched only once
+            queries_for_source.setdefault(source, []).append((result, target))
+
+    groups = [(source, sorted({target for _, target in queries})) for source, queries in queries_for_source.items()]
+    emitted = 0
+    for source, paths, searched_complete, group_stats in map_paths(groups, workers, directory, cache):
+        for result, target in queries_for_source[source]:
+            path = paths[target]
+            if not searched_complete:
+                result["complete"] = False
+            if group_stats is not None:
+                lookup = result["stats"]["phases"]
+                result["stats"] = dict(group_stats, phases=dict(lookup, **group_stats["phases"]))
+                if len(queries_for_source[source]) > 1:
+                    result["stats"]["shared_by"] = len(queries_for_source[source])
+            result["degrees"] = None if path is None else len(path)
+            result["path"] = None if path is None else [
+                {
+                    "movie_id": movie_id,
+                    "movie": movie_for_id(movie_id)["title"],
+                    "person_id": person_id,
+                    "person": person_for_id(person_id)["name"]
+                }
+                for movie_id, person_id in path
+            ]
+
+        # Stream out every result whose earlier lines are all answered
+        while emitted < len(results) and ("error" in results[emitted] or "degrees" in results[emitted]):
+            yield results[emitted]
+            emitted += 1
+    yield from results[emitted:]
 
-    while True:
-        if frontier.empty():
-            raise Exception("no solution found")
 
-        node = frontier.remove()
-        states_explored += 1
+def map_paths(groups, workers=1, directory=None, cache=True):
+    """
+    Yields answer_group((source, targets)) for each group in `groups`,
+    in completion order.
+
+    With more than one worker, each process of the pool loads the data
+    once: forked workers share the parent's graph, and spawned workers
+    memory-map the snapshot instead of parsing the CSV files again.
+    """
+    if workers <= 1:
+        for group in groups:
+            yield answer_group(group)
+        return
+
+    mode = "compact" if graph is not None else "dict"
+    count = len(landmarks.landmarks) if landmarks is not None else 0
+    chunksize = max(1, len(groups) // (workers * 8))
+    args = (directory, mode, search, cache, count, instrumented)
+    with multiprocessing.Pool(workers, initialize_worker, args) as pool:
+        yield from pool.imap_unordered(answer_group, groups, chunksize)
+
+
+def initialize_worker(directory, mode, strategy, cache, landmark_count, instrument=False):
+    """
+    Load the data in a query worker, unless it was inherited by forking.
+    """
+    global search, instrumented
+    search = strategy
+    instrumented = instrument
+    if graph is not None or people:
+        return
+    if mode == "compact":
+        load_compact_data(directory, cache)
+        if landmark_count:
+            load_landmarks(directory, landmark_count, cache)
+    else:
+        load_data(directory)
 
-        if (node.state == target):
-            output = []
-            while node.parent is not None:
-                output.append((node.action, node.state))
-                node = node.parent
-            output.reverse()
-            return output
 
-        explored.add(node.state)
+def answer_group(group):
+    """
+    Returns (source, paths, complete, stats) for a (source, targets) group
+    of queries, where `complete` is False if the search ran on partial data
+    and `stats` is a dictionary of SearchStats, or None when not instrumented.
+    """
+    source, targets = group
+    searched_complete = complete
+    stats = SearchStats() if instrumented else None
+    paths = shortest_paths(source, targets, stats)
+    return source, paths, searched_complete, None if stats is None else stats.as_dict()
 
-        for action, state in neighbors_for_person(node.state):
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node, action=action)
-                frontier.add(child)            
-    # TODO
-    raise NotImplementedError
 
+def resolve_name(name, result, field):
+    """
+    Returns the IMDB id for `name` without prompting, or None after
+    recording in `result` that no one matched.
 
-def person_id_for_name(name):
+    Names without a single exact match resolve to the best ranked
+    candidate, and the kind of match and the other candidates are
+    recorded in `result`.
+    """
+    candidates = person_candidates(name)
+    if not candidates:
+        result["error"] = f"{field} not found"
+        return None
+    person_id, match = candidates[0]
+    result[field + "_id"] = person_id
+    if match != "exact" or len(candidates) > 1 and candidates[1][1] == "exact":
+        result[field + "_match"] = match
+        result[field + "_candidates"] = [candidate for candidate, _ in candidates]
+    return person_id
+
+
+def person_candidates(name, limit=10):
+    """
+    Returns up to `limit` (person_id, match) pairs for people whose name
+    matches `name` exactly, starts with it, or is one typo away from it,
+    best matches and most credited people first.
+    """
+    with lock:
+        return name_index.search(name, limit)
+
+
+def person_ids_for_name(name):
+    """
+    Returns the IMDB ids of everyone with the given name.
+    """
+    return name_index.exact(name_key(name))
+
+
+def person_id_for_name(name, stats=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    with phase(stats, "lookup"):
+        person_ids = person_ids_for_name(name)
+
+        # Offer the closest names when nobody matches exactly
+        suggested = len(person_ids) == 0
+        if suggested:
+            person_ids = [person_id for person_id, _ in person_candidates(name)]
     if len(person_ids) == 0:
         return None
-    elif len(person_ids) > 1:
-        print("Which '{name}'?")
+    elif len(person_ids) > 1 or suggested:
+        print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_for_id(person_id)
             name = person["name"]
             birth = person["birth"]
-            print("ID: {person_id}, Name: {name}, Birth: {birth}")
+            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
             if person_id in person_ids:
@@ -150,11 +544,45 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_for_id(person_id):
+    """
+    Returns a dictionary with the name and birth of a person.
+    """
+    if graph is not None:
+        return graph.person(person_id)
+    return people[person_id]
+
+
+def movie_for_id(movie_id):
+    """
+    Returns a dictionary with the title and year of a movie.
+    """
+    if graph is not None:
+        return graph.movie(movie_id)
+    return movies[movie_id]
+
+
+def movies_for_person(person_id):
+    """
+    Returns the movie_ids a person starred in.
+    """
+    return people[person_id]["movies"]
+
+
+def stars_for_movie(movie_id):
+    """
+    Returns the person_ids who starred in a movie.
+    """
+    return movies[movie_id]["stars"]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,283 @@
+import csv
+from array import array
+from bisect import bisect_left
+
+from instrument import phase
+from nameindex import hash_table, max_tree, name_key
+from search import SEARCHES, paths_from
+
+
+class StringTable():
+    """
+    Immutable sequence of strings packed into a single UTF-8 blob,
+    with `offsets[i]:offsets[i + 1]` delimiting the i-th string.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array("q", [0])
+        blob = bytearray()
+        for string in strings:
+            blob += string.encode()
+            offsets.append(len(blob))
+        return cls(offsets, bytes(blob))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode()
+
+    def nbytes(self):
+        return memoryview(self.offsets).nbytes + len(self.blob)
+
+
+class CompactGraph():
+    """
+    The people/movies star graph with person and movie IDs interned
+    to dense integers.
+
+    Person p starred in movies person_movies[person_offsets[p]:person_offsets[p + 1]],
+    and movie m has stars movie_stars[movie_offsets[m]:movie_offsets[m + 1]]
+    (compressed sparse row adjacency in both directions).
+    """
+
+    TABLES = ("person_ids", "person_names", "person_births", "movie_ids", "movie_titles", "movie_years")
+    ARRAYS = (
+        "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+        "person_order", "movie_order", "name_order", "name_slots", "name_hashes", "name_counts", "name_tree"
+    )
+
+    def __init__(self, tables, arrays):
+        self.person_ids = tables["person_ids"]
+        self.person_names = tables["person_names"]
+        self.person_births = tables["person_births"]
+        self.movie_ids = tables["movie_ids"]
+        self.movie_titles = tables["movie_titles"]
+        self.movie_years = tables["movie_years"]
+
+        self.person_offsets = arrays["person_offsets"]
+        self.person_movies = arrays["person_movies"]
+        self.movie_offsets = arrays["movie_offsets"]
+        self.movie_stars = arrays["movie_stars"]
+
+        # Person and movie indices sorted by ID, and person indices sorted by name
+        self.person_order = arrays["person_order"]
+        self.movie_order = arrays["movie_order"]
+        self.name_order = arrays["name_order"]
+
+        # Hash table from each distinct name to its first position in name_order
+        self.name_slots = arrays["name_slots"]
+        self.name_hashes = arrays["name_hashes"]
+
+        # Movie counts in name_order, and a nameindex.max_tree over them
+        self.name_counts = arrays["name_counts"]
+        self.name_tree = arrays["name_tree"]
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Load the people, movies and stars CSV files in `directory`.
+        """
+        person_index = {}
+        person_ids, person_names, person_births = [], [], []
+        with open(directory + "/people.csv") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if row["id"] in person_index:
+                    continue
+                person_index[row["id"]] = len(person_ids)
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_index = {}
+        movie_ids, movie_titles, movie_years = [], [], []
+        with open(directory + "/movies.csv") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if row["id"] in movie_index:
+                    continue
+                movie_index[row["id"]] = len(movie_ids)
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        # Encode each (person, movie) edge as one integer so duplicates sort together
+        movie_count = len(movie_ids)
+        edges = array("q")
+        with open(directory + "/stars.csv") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                try:
+                    p = person_index[row["person_id"]]
+                    m = movie_index[row["movie_id"]]
+                except KeyError:
+                    continue
+                edges.append(p * movie_count + m)
+        edges = array("q", sorted(set(edges)))
+
+        edge_people = array("i", (edge // movie_count for edge in edges))
+        edge_movies = array("i", (edge % movie_count for edge in edges))
+        del edges
+
+        arrays = {}
+        arrays["person_offsets"], arrays["person_movies"] = csr(edge_people, edge_movies, len(person_ids))
+        arrays["movie_offsets"], arrays["movie_stars"] = csr(edge_movies, edge_people, movie_count)
+        arrays["person_order"] = array("i", sorted(range(len(person_ids)), key=person_ids.__getitem__))
+        arrays["movie_order"] = array("i", sorted(range(movie_count), key=movie_ids.__getitem__))
+        keys = [name_key(name) for name in person_names]
+        arrays["name_order"] = array("i", sorted(range(len(person_ids)), key=keys.__getitem__))
+        arrays["name_slots"], arrays["name_hashes"] = hash_table([keys[p] for p in arrays["name_order"]])
+        person_offsets = arrays["person_offsets"]
+        arrays["name_counts"] = array("i", (person_offsets[p + 1] - person_offsets[p] for p in arrays["name_order"]))
+        arrays["name_tree"] = max_tree(arrays["name_counts"])
+
+        tables = {
+            "person_ids": StringTable.from_strings(person_ids),
+            "person_names": StringTable.from_strings(person_names),
+            "person_births": StringTable.from_strings(person_births),
+            "movie_ids": StringTable.from_strings(movie_ids),
+            "movie_titles": StringTable.from_strings(movie_titles),
+            "movie_years": StringTable.from_strings(movie_years),
+        }
+        return cls(tables, arrays)
+
+    def edge_count(self):
+        return len(self.person_movies)
+
+    def nbytes(self):
+        """
+        Returns the number of bytes held by the graph's tables and arrays.
+        """
+        total = 0
+        for value in vars(self).values():
+            if isinstance(value, StringTable):
+                total += value.nbytes()
+            else:
+                total += memoryview(value).nbytes
+        return total
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of `person_id`, or None if it is unknown.
+        """
+        return _find(self.person_order, self.person_ids.__getitem__, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of `movie_id`, or None if it is unknown.
+        """
+        return _find(self.movie_order, self.movie_ids.__getitem__, movie_id)
+
+    def person(self, person_id):
+        """
+        Returns a dictionary of: name, birth for `person_id`.
+        """
+        p = self.person_index(person_id)
+        return {"name": self.person_names[p], "birth": self.person_births[p]}
+
+    def movie(self, movie_id):
+        """
+        Returns a dictionary of: title, year for `movie_id`.
+        """
+        m = self.movie_index(movie_id)
+        return {"title": self.movie_titles[m], "year": self.movie_years[m]}
+
+    def movies_of(self, p):
+        """
+        Returns the movie indices person index `p` starred in.
+        """
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        """
+        Returns the person indices who starred in movie index `m`.
+        """
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with person index `p`.
+        """
+        person_offsets, movie_offsets = self.person_offsets, self.movie_offsets
+        movie_stars = self.movie_stars
+        for m in self.person_movies[person_offsets[p]:person_offsets[p + 1]]:
+            for q in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                yield m, q
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        return {
+            (self.movie_ids[m], self.person_ids[q])
+            for m, q in self.neighbors(self.person_index(person_id))
+        }
+
+    def shortest_path(self, source, target, search="bidirectional", stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, searching over
+        dense indices.
+
+        If no possible path, returns None.
+        """
+        s, t = self.person_index(source), self.person_index(target)
+        path = SEARCHES[search](s, t, self.movies_of, self.stars_of, stats=stats)
+        if path is None:
+            return None
+        with phase(stats, "reconstruction"):
+            return self.path_ids(path)
+
+    def paths_from(self, source, targets, stats=None):
+        """
+        Returns a dictionary mapping each of `targets` to its shortest
+        path from the source, found with one breadth-first search.
+        """
+        indices = {self.person_index(target): target for target in targets}
+        paths = paths_from(self.person_index(source), indices, self.movies_of, self.stars_of, stats)
+        with phase(stats, "reconstruction"):
+            return {indices[t]: None if path is None else self.path_ids(path) for t, path in paths.items()}
+
+    def path_ids(self, path):
+        """
+        Returns a path of (movie, person) indices as (movie_id, person_id) pairs.
+        """
+        return [(self.movie_ids[m], self.person_ids[p]) for m, p in path]
+
+
+def csr(rows, columns, row_count):
+    """
+    Build (offsets, columns) arrays grouping the edges
+    `rows[i] -> columns[i]` by row.
+    """
+    offsets = array("q", bytes(8 * (row_count + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for row in range(row_count):
+        offsets[row + 1] += offsets[row]
+
+    grouped = array("i", bytes(4 * len(rows)))
+    cursor = array("q", offsets)
+    for row, column in zip(rows, columns):
+        grouped[cursor[row]] = column
+        cursor[row] += 1
+    return offsets, grouped
+
+
+def _find(order, key, value):
+    """
+    Returns the element of `order` whose key equals `value`,
+    or None if there is none.
+    """
+    i = bisect_left(order, value, key=key)
+    if i < len(order) and key(order[i]) == value:
+        return order[i]
+    return None
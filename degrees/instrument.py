@@ -0,0 +1,67 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class SearchStats():
+    """
+    Counters and phase timings for one query.
+
+    Searches report each expansion through `expanded(people, movies, neighbors)`
+    and each new frontier through `frontier(size)`, and time their work
+    with `phase(name)`, so any object with those three methods can be
+    passed in their place.
+    """
+
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.movies_expanded = 0
+        self.neighbor_expansions = 0
+        self.max_frontier = 0
+        self.phases = {}
+        self._nested = []
+
+    def expanded(self, people, movies, neighbors):
+        """
+        Record that `people` were expanded through `movies` movies,
+        looking at `neighbors` stars.
+        """
+        self.nodes_expanded += people
+        self.movies_expanded += movies
+        self.neighbor_expansions += neighbors
+
+    def frontier(self, size):
+        self.max_frontier = max(self.max_frontier, size)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Add the time spent inside the block to phase `name`.
+        Time spent in a phase nested inside it counts only towards
+        the inner phase, so the phases add up to the total time.
+        """
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def as_dict(self):
+        return {
+            "nodes_expanded": self.nodes_expanded,
+            "movies_expanded": self.movies_expanded,
+            "neighbor_expansions": self.neighbor_expansions,
+            "max_frontier": self.max_frontier,
+            "phases": dict(self.phases),
+        }
+
+
+def phase(stats, name):
+    """
+    Returns stats.phase(name), or a context that does nothing when `stats` is None.
+    """
+    return nullcontext() if stats is None else stats.phase(name)
@@ -0,0 +1,154 @@
+import os
+from array import array
+
+from instrument import phase
+from search import bidirectional_search
+from snapshot import read_sections, source_hashes, source_signature, write_sections
+
+# Landmark index file written next to the CSV files of a dataset
+INDEX = "landmarks.index"
+
+# Bump whenever the layout of the index changes
+VERSION = 1
+
+MAGIC = b"LANDMARK"
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 0xFFFF
+
+# Widest gap between the landmark bounds at which a search is pruned
+PRUNE_SLACK = 1
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few high-degree landmark people
+    to everyone in a CompactGraph.
+
+    By the triangle inequality, d(s, t) lies between
+    max |d(L, s) - d(L, t)| and min d(L, s) + d(L, t) over landmarks L.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count):
+        """
+        Pick the `count` people who starred in the most movies
+        as landmarks and compute their distances to everyone.
+        """
+        offsets = graph.person_offsets
+        people = sorted(range(len(offsets) - 1), key=lambda p: offsets[p] - offsets[p + 1])
+        landmarks = people[:count]
+        return cls(graph, landmarks, [distances_from(graph, p) for p in landmarks])
+
+    def bounds(self, s, t):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        person indices `s` and `t`, or None if they are not connected.
+        """
+        if s == t:
+            return 0, 0
+        lower, upper = 1, None
+        for distances in self.distances:
+            ds, dt = distances[s], distances[t]
+            if (ds == UNREACHABLE) != (dt == UNREACHABLE):
+                return None
+            if ds == UNREACHABLE:
+                continue
+            lower = max(lower, abs(ds - dt))
+            upper = ds + dt if upper is None else min(upper, ds + dt)
+        return lower, upper
+
+    def estimate(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two IMDB ids without searching, or None if they are not connected.
+        An upper bound of None means no landmark reaches either person.
+        """
+        return self.bounds(self.graph.person_index(source), self.graph.person_index(target))
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        Pairs the landmarks show to be disconnected are answered without
+        searching, and all others by a plain bidirectional search: pruning
+        that search with landmark bounds cost more than it saved.
+
+        If no possible path, returns None.
+        """
+        graph = self.graph
+        s, t = graph.person_index(source), graph.person_index(target)
+        if self.bounds(s, t) is None:
+            return None
+        path = bidirectional_search(s, t, graph.movies_of, graph.stars_of, stats)
+        if path is None:
+            return None
+        with phase(stats, "reconstruction"):
+            return graph.path_ids(path)
+
+
+def distances_from(graph, p):
+    """
+    Returns an array of breadth-first distances from person index `p`
+    to every person, with UNREACHABLE for people in other components.
+    Each movie's cast is expanded only once.
+    """
+    person_offsets, person_movies = graph.person_offsets, graph.person_movies
+    movie_offsets, movie_stars = graph.movie_offsets, graph.movie_stars
+    distances = array("H", [UNREACHABLE]) * (len(person_offsets) - 1)
+    expanded = bytearray(len(movie_offsets) - 1)
+
+    distances[p] = 0
+    layer = [p]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for q in layer:
+            for m in person_movies[person_offsets[q]:person_offsets[q + 1]]:
+                if expanded[m]:
+                    continue
+                expanded[m] = 1
+                for r in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                    if distances[r] == UNREACHABLE:
+                        distances[r] = depth
+                        next_layer.append(r)
+        layer = next_layer
+    return distances
+
+
+def load_index(directory, graph, count, cache=True):
+    """
+    Return the LandmarkIndex with `count` landmarks for the dataset in
+    `directory`, memory-mapping the stored index when it was built
+    from the current CSV files and rebuilding it otherwise.
+    """
+    path = os.path.join(directory, INDEX)
+    known = None
+    if cache and os.path.exists(path):
+        try:
+            header, sections = read_sections(path, MAGIC)
+        except (OSError, ValueError):
+            header = None
+        if header and header["version"] == VERSION and len(header["landmarks"]) == count:
+            known = header["sources"]
+            sources = source_signature(directory, known)
+            if source_hashes(sources) == source_hashes(known):
+                distances = [sections[str(i)] for i in range(count)]
+                return LandmarkIndex(graph, header["landmarks"], distances)
+
+    sources = source_signature(directory, known)
+    index = LandmarkIndex.build(graph, count)
+    if cache:
+        header = {"version": VERSION, "sources": sources, "landmarks": index.landmarks}
+        try:
+            write_sections(path, MAGIC, header, {str(i): d for i, d in enumerate(index.distances)})
+        except OSError:
+            pass
+    return index
@@ -0,0 +1,279 @@
+import heapq
+import zlib
+from array import array
+from bisect import bisect_left
+
+# Characters tried when generating typo variants of a name
+ALPHABET = "abcdefghijklmnopqrstuvwxyz .-'"
+
+# Kinds of match, best first
+MATCHES = ("exact", "prefix", "fuzzy")
+
+# Sorts after any character of a name, to bound a range of prefix matches
+LAST = "\U0010ffff"
+
+
+def name_key(name):
+    """
+    Returns the form of `name` used for lookups: lowercase, with
+    runs of whitespace collapsed.
+    """
+    return " ".join(name.lower().split())
+
+
+def name_hash(key):
+    """
+    Returns a hash of `key` that is stable across runs,
+    unlike the built-in hash of a string.
+    """
+    return zlib.crc32(key.encode())
+
+
+def hash_table(keys):
+    """
+    Build an open-addressing hash table over the sorted sequence `keys`.
+    Returns (slots, hashes) arrays, where each distinct key has a slot
+    holding the position of its first occurrence in `keys`
+    (-1 for empty slots) and the hash of that key.
+    """
+    distinct = sum(1 for i in range(len(keys)) if i == 0 or keys[i] != keys[i - 1])
+    size = 8
+    while size < 2 * distinct:
+        size *= 2
+    mask = size - 1
+
+    slots = array("i", [-1]) * size
+    hashes = array("I", [0]) * size
+    for i in range(len(keys)):
+        if i > 0 and keys[i] == keys[i - 1]:
+            continue
+        h = name_hash(keys[i])
+        slot = h & mask
+        while slots[slot] != -1:
+            slot = (slot + 1) & mask
+        slots[slot] = i
+        hashes[slot] = h
+    return slots, hashes
+
+
+def edits(key):
+    """
+    Returns every string one deletion, transposition, substitution
+    or insertion away from `key`.
+    """
+    splits = [(key[:i], key[i:]) for i in range(len(key) + 1)]
+    deletes = [left + right[1:] for left, right in splits if right]
+    transposes = [left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1]
+    replaces = [left + c + right[1:] for left, right in splits if right for c in ALPHABET]
+    inserts = [left + c + right for left, right in splits for c in ALPHABET]
+    return set(deletes + transposes + replaces + inserts) - {key}
+
+
+def max_tree(counts):
+    """
+    Build a segment tree over the sequence `counts` for MaxTree.
+    Returns an array whose leaves, from position len // 2 on, are the
+    positions of `counts` (-1 past its end), and whose node j holds
+    whichever of nodes 2j and 2j + 1 has the larger count.
+    """
+    size = 1
+    while size < len(counts):
+        size *= 2
+    tree = array("i", [-1]) * (2 * size)
+    tree[size:size + len(counts)] = array("i", range(len(counts)))
+    better = MaxTree(counts, tree).better
+    for j in range(size - 1, 0, -1):
+        tree[j] = better(tree[2 * j], tree[2 * j + 1])
+    return tree
+
+
+class MaxTree():
+    """
+    A segment tree over a sequence of counts, built by max_tree, finding
+    the position of the largest count in any range in logarithmic time.
+    Ties go to the earliest position.
+    """
+
+    def __init__(self, counts, tree):
+        self.counts = counts
+        self.tree = tree
+        self.size = len(tree) // 2
+
+    def better(self, i, j):
+        if i == -1 or j == -1:
+            return max(i, j)
+        if self.counts[j] > self.counts[i] or (self.counts[j] == self.counts[i] and j < i):
+            return j
+        return i
+
+    def argmax(self, lo, hi):
+        """
+        Returns the position of the largest count in [lo, hi).
+        """
+        best = -1
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                best = self.better(best, self.tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self.better(best, self.tree[hi])
+            lo //= 2
+            hi //= 2
+        return best
+
+    def top(self, lo, hi, limit):
+        """
+        Returns the positions of the `limit` largest counts in [lo, hi),
+        largest first, splitting the range around each one found.
+        """
+        ranges = []
+
+        def push(lo, hi):
+            if lo < hi:
+                i = self.argmax(lo, hi)
+                heapq.heappush(ranges, (-self.counts[i], i, lo, hi))
+
+        push(lo, hi)
+        positions = []
+        while ranges and len(positions) < limit:
+            _, i, lo, hi = heapq.heappop(ranges)
+            positions.append(i)
+            push(lo, i)
+            push(i + 1, hi)
+        return positions
+
+
+class NameIndex():
+    """
+    Ranked exact, prefix and typo-tolerant lookup of people by name.
+
+    Subclasses look people up by a handle of their choosing through
+    `matches(key)`, `movie_count(handle)` and `person_id(handle)`, and
+    list everyone in order of name key through `handles()` and
+    `prefix_range(key)`, the range of that order whose keys start with `key`.
+
+    `movie_counts` is a MaxTree of movie counts in that order, built on
+    the first prefix lookup unless a subclass provides one; set it back
+    to None whenever movie counts change.
+    """
+
+    movie_counts = None
+
+    def exact(self, key):
+        """
+        Returns the IMDB ids of everyone whose name key is `key`.
+        """
+        return [self.person_id(handle) for handle in self.matches(key)]
+
+    def prefixed(self, key, limit):
+        """
+        Returns the handles of the `limit` people who starred in the most
+        movies among everyone whose name key starts with `key`.
+        """
+        if self.movie_counts is None:
+            counts = array("i", (self.movie_count(handle) for handle in self.handles()))
+            self.movie_counts = MaxTree(counts, max_tree(counts))
+        lo, hi = self.prefix_range(key)
+        return [self.handle(i) for i in self.movie_counts.top(lo, hi, limit)]
+
+    def search(self, name, limit=10):
+        """
+        Returns up to `limit` (person_id, match) pairs for `name`.
+        Exact matches win outright; otherwise names starting with it come
+        before names one typo away. Within each kind of match, people who
+        starred in more movies come first.
+        """
+        key = name_key(name)
+        ranks = dict.fromkeys(self.matches(key), 0)
+        if not ranks:
+            for handle in self.prefixed(key, limit):
+                ranks.setdefault(handle, 1)
+            for variant in edits(key):
+                for handle in self.matches(variant):
+                    ranks.setdefault(handle, 2)
+
+        ranked = sorted(ranks, key=lambda handle: (ranks[handle], -self.movie_count(handle)))
+        return [(self.person_id(handle), MATCHES[ranks[handle]]) for handle in ranked[:limit]]
+
+
+class GraphNameIndex(NameIndex):
+    """
+    Name lookup over a CompactGraph's sorted name order, name hash table
+    and movie count tree.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.mask = len(graph.name_slots) - 1
+        self.movie_counts = MaxTree(graph.name_counts, graph.name_tree)
+
+    def key(self, i):
+        return name_key(self.graph.person_names[self.graph.name_order[i]])
+
+    def matches(self, key):
+        graph = self.graph
+        h = name_hash(key)
+        slot = h & self.mask
+        while graph.name_slots[slot] != -1:
+            i = graph.name_slots[slot]
+            if graph.name_hashes[slot] == h and self.key(i) == key:
+                people = []
+                while i < len(graph.name_order) and self.key(i) == key:
+                    people.append(graph.name_order[i])
+                    i += 1
+                return people
+            slot = (slot + 1) & self.mask
+        return []
+
+    def handles(self):
+        return self.graph.name_order
+
+    def handle(self, i):
+        return self.graph.name_order[i]
+
+    def prefix_range(self, key):
+        positions = range(len(self.graph.name_order))
+        return bisect_left(positions, key, key=self.key), bisect_left(positions, key + LAST, key=self.key)
+
+    def movie_count(self, p):
+        return self.graph.person_offsets[p + 1] - self.graph.person_offsets[p]
+
+    def person_id(self, p):
+        return self.graph.person_ids[p]
+
+
+class DictNameIndex(NameIndex):
+    """
+    Name lookup over the `names` and `people` dictionaries of degrees.load_data.
+    """
+
+    def __init__(self, names, people):
+        self.names = {}
+        for name, person_ids in names.items():
+            self.names.setdefault(name_key(name), set()).update(person_ids)
+        self.people = people
+
+        # Everyone in order of name key, then id
+        self.entries = sorted((key, person_id) for key, person_ids in self.names.items() for person_id in person_ids)
+        self.keys = [key for key, _ in self.entries]
+
+    def matches(self, key):
+        return sorted(self.names.get(key, ()))
+
+    def handles(self):
+        return (person_id for _, person_id in self.entries)
+
+    def handle(self, i):
+        return self.entries[i][1]
+
+    def prefix_range(self, key):
+        return bisect_left(self.keys, key), bisect_left(self.keys, key + LAST)
+
+    def movie_count(self, person_id):
+        return len(self.people[person_id]["movies"])
+
+    def person_id(self, person_id):
+        return person_id
@@ -0,0 +1,201 @@
+from instrument import phase
+from util import Node, DequeQueueFrontier
+
+
+def breadth_first_search(source, target, movies_for, stars_for, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, expanding outwards
+    from the source one layer at a time.
+
+    `movies_for` maps a person_id to the movies they starred in, and
+    `stars_for` maps a movie_id to its stars.
+    `stats`, if given, is an instrument.SearchStats told about the work done.
+    If no possible path, returns None.
+    """
+    initial = Node(state=source, parent=None, action=None)
+    frontier = DequeQueueFrontier()
+    frontier.add(initial)
+
+    explored = set()
+    expanded = set()
+
+    while not frontier.empty():
+        node = frontier.remove()
+
+        if node.state == target:
+            with phase(stats, "reconstruction"):
+                output = []
+                while node.parent is not None:
+                    output.append((node.action, node.state))
+                    node = node.parent
+                output.reverse()
+            return output
+
+        explored.add(node.state)
+
+        movies = neighbors = 0
+        for action in movies_for(node.state):
+            # Everyone in a movie's cast is reached the first time it is expanded
+            if action in expanded:
+                continue
+            expanded.add(action)
+            stars = stars_for(action)
+            movies += 1
+            neighbors += len(stars)
+            for state in stars:
+                if not frontier.contains_state(state) and state not in explored:
+                    child = Node(state=state, parent=node, action=action)
+                    frontier.add(child)
+        if stats is not None:
+            stats.expanded(1, movies, neighbors)
+            stats.frontier(len(frontier.frontier))
+
+    return None
+
+
+class SearchTree():
+    """
+    One side of a layered breadth-first search.
+
+    `reached` maps each discovered person to the movie they were reached
+    through (None for the root), and `expanded` maps each movie whose
+    cast has been expanded to the person it was expanded from, so paths
+    are recovered without storing a tuple per person.
+    """
+
+    def __init__(self, root):
+        self.reached = {root: None}
+        self.expanded = {}
+        self.layer = [root]
+        self.depth = 0
+
+    def expand(self, movies_for, stars_for, stats=None):
+        """
+        Expands the current layer, marking people reached as they are
+        discovered and expanding each movie's cast at most once.
+        Yields every newly reached person and replaces the layer with them.
+        """
+        reached, expanded = self.reached, self.expanded
+        self.depth += 1
+        next_layer = []
+        movies = neighbors = 0
+        for person_id in self.layer:
+            for movie_id in movies_for(person_id):
+                if movie_id in expanded:
+                    continue
+                expanded[movie_id] = person_id
+                stars = stars_for(movie_id)
+                movies += 1
+                neighbors += len(stars)
+                for neighbor in stars:
+                    if neighbor in reached:
+                        continue
+                    reached[neighbor] = movie_id
+                    next_layer.append(neighbor)
+                    yield neighbor
+        if stats is not None:
+            stats.expanded(len(self.layer), movies, neighbors)
+            stats.frontier(len(next_layer))
+        self.layer = next_layer
+
+    def depth_of(self, person_id):
+        """
+        Returns how many steps `person_id` is from the root.
+        """
+        depth = 0
+        while self.reached[person_id] is not None:
+            person_id = self.expanded[self.reached[person_id]]
+            depth += 1
+        return depth
+
+    def path_to(self, person_id):
+        """
+        Returns the list of (movie_id, person_id) pairs from the root
+        to `person_id`.
+        """
+        path = []
+        while self.reached[person_id] is not None:
+            movie_id = self.reached[person_id]
+            path.append((movie_id, person_id))
+            person_id = self.expanded[movie_id]
+        path.reverse()
+        return path
+
+    def path_from(self, person_id):
+        """
+        Returns the list of (movie_id, person_id) pairs from `person_id`
+        back to the root.
+        """
+        path = []
+        while self.reached[person_id] is not None:
+            movie_id = self.reached[person_id]
+            person_id = self.expanded[movie_id]
+            path.append((movie_id, person_id))
+        return path
+
+
+def bidirectional_search(source, target, movies_for, stars_for, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, expanding from both
+    ends and meeting in the middle.
+
+    Each step expands one whole layer of whichever side currently
+    has the smaller frontier. Once a layer touches the other side,
+    the shortest path through that layer is returned.
+
+    `movies_for` maps a person_id to the movies they starred in, and
+    `stars_for` maps a movie_id to its stars.
+    `stats`, if given, is an instrument.SearchStats told about the work done.
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    forward = SearchTree(source)
+    backward = SearchTree(target)
+    while forward.layer and backward.layer:
+        expand_forward = len(forward.layer) <= len(backward.layer)
+        tree, other = (forward, backward) if expand_forward else (backward, forward)
+
+        best = None
+        for person_id in tree.expand(movies_for, stars_for, stats):
+            if person_id in other.reached:
+                length = other.depth_of(person_id)
+                if best is None or length < best[0]:
+                    best = (length, person_id)
+
+        if best is not None:
+            meeting = best[1]
+            with phase(stats, "reconstruction"):
+                return forward.path_to(meeting) + backward.path_from(meeting)
+
+    return None
+
+
+def paths_from(source, targets, movies_for, stars_for, stats=None):
+    """
+    Returns a dictionary mapping each of `targets` to the shortest list
+    of (movie_id, person_id) pairs that connect the source to it, or to
+    None if it is not connected, using a single breadth-first search.
+    `stats`, if given, is an instrument.SearchStats told about the work done.
+    """
+    remaining = set(targets)
+    remaining.discard(source)
+    tree = SearchTree(source)
+    while tree.layer and remaining:
+        for person_id in tree.expand(movies_for, stars_for, stats=stats):
+            remaining.discard(person_id)
+
+    with phase(stats, "reconstruction"):
+        return {
+            target: tree.path_to(target) if target in tree.reached else None
+            for target in targets
+        }
+
+
+SEARCHES = {
+    "bfs": breadth_first_search,
+    "bidirectional": bidirectional_search,
+}
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+from graph import CompactGraph, StringTable
+
+# Snapshot file written next to the CSV files of a dataset
+SNAPSHOT = "degrees.snapshot"
+
+# Bump whenever the layout of the snapshot or of CompactGraph changes
+VERSION = 3
+
+MAGIC = b"DEGREES\0"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+
+def load_graph(directory, cache=True):
+    """
+    Return the CompactGraph for `directory`, memory-mapping its snapshot
+    when it is still valid for the CSV files and rebuilding (and
+    rewriting) it from the CSV files otherwise.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    header = graph = None
+    if cache and os.path.exists(path):
+        try:
+            header, graph = read_snapshot(path)
+        except (OSError, ValueError):
+            header = graph = None
+
+    sources = source_signature(directory, header["sources"] if graph is not None else None)
+    if graph is not None:
+        if sources == header["sources"]:
+            return graph
+        if source_hashes(sources) == source_hashes(header["sources"]):
+            # CSV files were touched but not changed, so only the header is stale
+            _try_write(path, graph, sources)
+            return graph
+
+    graph = CompactGraph.from_csv(directory)
+    if cache:
+        _try_write(path, graph, sources)
+    return graph
+
+
+def source_signature(directory, known=None):
+    """
+    Return the size, modification time and SHA-256 of each CSV file.
+
+    Files whose size and modification time match `known` reuse its
+    hash instead of being read again.
+    """
+    sources = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        previous = (known or {}).get(filename)
+        if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+            sources[filename] = previous
+            continue
+        digest = hashlib.sha256()
+        with open(os.path.join(directory, filename), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        sources[filename] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    return sources
+
+
+def write_snapshot(path, graph, sources):
+    """
+    Write `graph` to `path`, replacing any existing snapshot atomically.
+    """
+    sections = {}
+    for name in CompactGraph.TABLES:
+        table = getattr(graph, name)
+        sections[name + ".offsets"] = table.offsets
+        sections[name + ".blob"] = table.blob
+    for name in CompactGraph.ARRAYS:
+        sections[name] = getattr(graph, name)
+    write_sections(path, MAGIC, {"version": VERSION, "sources": sources}, sections)
+
+
+def read_snapshot(path):
+    """
+    Memory-map the snapshot at `path`.
+    Return its header and a CompactGraph viewing the mapped sections,
+    or None in place of the graph if the snapshot has another version.
+    """
+    header, sections = read_sections(path, MAGIC)
+    if header.get("version") != VERSION:
+        return header, None
+
+    tables = {
+        name: StringTable(sections[name + ".offsets"], sections[name + ".blob"])
+        for name in CompactGraph.TABLES
+    }
+    arrays = {name: sections[name] for name in CompactGraph.ARRAYS}
+    return header, CompactGraph(tables, arrays)
+
+
+def write_sections(path, magic, header, sections):
+    """
+    Write `magic`, a JSON `header` and the buffers in `sections` to
+    `path`, with every section 8-byte aligned so it can be viewed in
+    place once memory-mapped. The file is replaced atomically.
+    """
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        view = memoryview(data)
+        layout[name] = [offset, view.nbytes, view.format]
+        offset += _aligned(view.nbytes)
+
+    header = json.dumps(dict(header, sections=layout)).encode()
+    start = _aligned(len(magic) + 8 + len(header))
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(magic + struct.pack("<Q", len(header)) + header)
+        f.write(bytes(start - f.tell()))
+        for data in sections.values():
+            view = memoryview(data).cast("B")
+            f.write(view)
+            f.write(bytes(_aligned(view.nbytes) - view.nbytes))
+    os.replace(temporary, path)
+
+
+def read_sections(path, magic):
+    """
+    Memory-map a file written by write_sections.
+    Return its header and a dictionary of memoryviews over its sections.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapping[:len(magic)] != magic:
+        raise ValueError(f"{path} has an unexpected format")
+    length, = struct.unpack_from("<Q", mapping, len(magic))
+    header = json.loads(mapping[len(magic) + 8:len(magic) + 8 + length])
+
+    start = _aligned(len(magic) + 8 + length)
+    view = memoryview(mapping)
+    sections = {}
+    for name, (offset, nbytes, typecode) in header.pop("sections").items():
+        sections[name] = view[start + offset:start + offset + nbytes].cast(typecode)
+    return header, sections
+
+
+def _try_write(path, graph, sources):
+    """
+    Write a snapshot, carrying on without one if the directory is read-only.
+    """
+    try:
+        write_snapshot(path, graph, sources)
+    except OSError:
+        pass
+
+
+def source_hashes(sources):
+    return {filename: source["sha256"] for filename, source in sources.items()}
+
+
+def _aligned(n):
+    return (n + 7) // 8 * 8
@@ -0,0 +1,218 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from snapshot import load_graph
+
+# CompactGraph the statistics are computed over, loaded once per process
+graph = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degrees of separation statistics for a dataset.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--samples", type=int, default=0,
+                        help="estimate from this many random sources instead of every person")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=64,
+                        help="sources searched together by each multi-source BFS")
+    parser.add_argument("--output", default="stats.json")
+    args = parser.parse_args()
+
+    global graph
+    start = time.perf_counter()
+    graph = load_graph(args.directory)
+    print(f"Data loaded in {time.perf_counter() - start:.2f}s.", file=sys.stderr)
+
+    summary = compute_stats(args.directory, args.samples, args.seed, args.workers, args.batch_size)
+    with open(args.output, "w") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Statistics written to {args.output}.", file=sys.stderr)
+
+
+def compute_stats(directory, samples=0, seed=0, workers=1, batch_size=64):
+    """
+    Returns a summary dictionary of graph size, degrees, connected
+    components and the distribution of degrees of separation, either
+    over every pair of people or estimated from `samples` random sources.
+    """
+    people = len(graph.person_offsets) - 1
+    movies = len(graph.movie_offsets) - 1
+    summary = {
+        "people": people,
+        "movies": movies,
+        "edges": graph.edge_count(),
+        "average_movies_per_person": graph.edge_count() / max(people, 1),
+        "average_stars_per_movie": graph.edge_count() / max(movies, 1),
+        "components": components_summary(connected_components()),
+    }
+
+    sources = list(range(people))
+    if samples and samples < people:
+        sources = sorted(random.Random(seed).sample(sources, samples))
+    batches = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+
+    distances = {}
+    eccentricities = {}
+    start = time.perf_counter()
+    for done, (counts, batch_eccentricities) in enumerate(map_batches(batches, workers, directory), 1):
+        for distance, count in counts.items():
+            distances[distance] = distances.get(distance, 0) + count
+        for eccentricity in batch_eccentricities:
+            eccentricities[eccentricity] = eccentricities.get(eccentricity, 0) + 1
+        report_progress(done, len(batches), time.perf_counter() - start)
+
+    pairs = sum(distances.values())
+    summary["separation"] = {
+        "exact": len(sources) == people,
+        "sources": len(sources),
+        "connected_pairs": pairs,
+        "distribution": {str(d): distances[d] for d in sorted(distances)},
+        "average": sum(d * count for d, count in distances.items()) / pairs if pairs else None,
+        "eccentricity": {str(e): eccentricities[e] for e in sorted(eccentricities)},
+        "diameter": max(eccentricities) if eccentricities else 0,
+    }
+    if len(sources) < people:
+        # Scale the sampled pair counts up to every source
+        summary["separation"]["estimated_connected_pairs"] = round(pairs * people / len(sources))
+    return summary
+
+
+def connected_components():
+    """
+    Returns a list of the number of people in each connected component,
+    largest first. Each movie's cast is expanded only once.
+    """
+    people = len(graph.person_offsets) - 1
+    seen = bytearray(people)
+    expanded = bytearray(len(graph.movie_offsets) - 1)
+    sizes = []
+    for root in range(people):
+        if seen[root]:
+            continue
+        seen[root] = 1
+        size = 0
+        stack = [root]
+        while stack:
+            p = stack.pop()
+            size += 1
+            for m in graph.movies_of(p):
+                if expanded[m]:
+                    continue
+                expanded[m] = 1
+                for q in graph.stars_of(m):
+                    if not seen[q]:
+                        seen[q] = 1
+                        stack.append(q)
+        sizes.append(size)
+    sizes.sort(reverse=True)
+    return sizes
+
+
+def components_summary(sizes):
+    """
+    Summarize component sizes as a count, the largest few and
+    a histogram of sizes.
+    """
+    histogram = {}
+    for size in sizes:
+        histogram[size] = histogram.get(size, 0) + 1
+    return {
+        "count": len(sizes),
+        "largest": sizes[:10],
+        "isolated_people": histogram.get(1, 0),
+        "sizes": {str(size): histogram[size] for size in sorted(histogram)},
+    }
+
+
+def multi_source_bfs(sources):
+    """
+    Run one breadth-first search from every person index in `sources`
+    at once, tracking which sources have reached each person as the bits
+    of an integer.
+
+    Returns ({distance: number of (source, person) pairs}, eccentricities),
+    where eccentricities lists the largest distance reached from each source.
+    """
+    people = len(graph.person_offsets) - 1
+    seen = [0] * people
+    frontier = {}
+    for bit, p in enumerate(sources):
+        seen[p] |= 1 << bit
+        frontier[p] = frontier.get(p, 0) | 1 << bit
+
+    counts = {}
+    eccentricity = [0] * len(sources)
+    distance = 0
+    while frontier:
+        distance += 1
+
+        # Gather the sources arriving at each movie, then pass them on to its cast
+        arriving = {}
+        for p, bits in frontier.items():
+            for m in graph.movies_of(p):
+                arriving[m] = arriving.get(m, 0) | bits
+        next_frontier = {}
+        for m, bits in arriving.items():
+            for q in graph.stars_of(m):
+                new = bits & ~seen[q]
+                if new:
+                    seen[q] |= new
+                    next_frontier[q] = next_frontier.get(q, 0) | new
+
+        reached = 0
+        pairs = 0
+        for bits in next_frontier.values():
+            reached |= bits
+            pairs += bin(bits).count("1")
+        if pairs:
+            counts[distance] = pairs
+        bit = 0
+        while reached:
+            if reached & 1:
+                eccentricity[bit] = distance
+            reached >>= 1
+            bit += 1
+        frontier = next_frontier
+    return counts, eccentricity
+
+
+def map_batches(batches, workers, directory):
+    """
+    Yields multi_source_bfs(batch) for each of `batches`, in completion
+    order, across `workers` processes that each load the graph once.
+    """
+    if workers <= 1:
+        for batch in batches:
+            yield multi_source_bfs(batch)
+        return
+    with multiprocessing.Pool(workers, initialize_worker, (directory,)) as pool:
+        yield from pool.imap_unordered(multi_source_bfs, batches)
+
+
+def initialize_worker(directory):
+    """
+    Load the graph in a statistics worker, unless it was inherited by forking.
+    """
+    global graph
+    if graph is None:
+        graph = load_graph(directory)
+
+
+def report_progress(done, total, seconds):
+    """
+    Print how many batches of sources are done and an estimate
+    of the time remaining.
+    """
+    remaining = seconds / done * (total - done)
+    print(f"\r{done}/{total} batches, {seconds:.0f}s elapsed, about {remaining:.0f}s left",
+          end="\n" if done == total else "", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,31 @@ PROBS = {
 }
 
 
+def inheritance_table(mutation):
+    """
+    Return a 3 x 3 x 3 nested list whose [mother][father][child] entry is
+    the probability of a child having `child` copies of the gene, given
+    that the mother and father have `mother` and `father` copies.
+    """
+    # Chance that a parent with 0, 1 or 2 copies passes the gene on
+    passes = [mutation, 0.5, 1 - mutation]
+    return [
+        [
+            [
+                (1 - mother) * (1 - father),
+                mother * (1 - father) + (1 - mother) * father,
+                mother * father
+            ]
+            for father in passes
+        ]
+        for mother in passes
+    ]
+
+
+# Child gene distribution for every pair of parent gene counts
+INHERITANCE = inheritance_table(PROBS["mutation"])
+
+
 def main():
 
     # Check for proper usage
@@ -59,38 +84,35 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+    # Loop over every assignment of genes and traits that fits the known traits
+    names = list(people)
+    for one_gene, two_genes, have_trait, p in assignments(people, names):
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+        # Update probabilities with new joint probability
+        update_masks(probabilities, names, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
 
     # Print results
+    print_probabilities(people, probabilities)
+
+
+def print_probabilities(people, probabilities, errors=None):
+    """
+    Print each person's gene and trait distributions, and the standard
+    error of each probability if `errors` has them in the same form.
+    """
     for person in people:
         print(f"{person}:")
         for field in probabilities[person]:
             print(f"  {field.capitalize()}:")
             for value in probabilities[person][field]:
                 p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    print(f"    {value}: {p:.4f} ± {errors[person][field][value]:.4f}")
 
 
 def load_data(filename):
@@ -115,6 +137,71 @@ def load_data(filename):
     return data
 
 
+def assignments(people, names):
+    """
+    Yield (one_gene, two_genes, have_trait, p) for every assignment of
+    genes and traits that agrees with the known traits, where the first
+    three are bitmasks with bit i set for names[i] and `p` is the joint
+    probability of the assignment.
+
+    People are assigned parents first, so `p` is built up one person at
+    a time, and a gene count or trait with zero probability is skipped
+    along with every assignment of the people after it. Only the current
+    assignment is held in memory.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    order = parents_first(people)
+    genes = {}
+
+    def assign(k, one_gene, two_genes, have_trait, p):
+        if k == len(order):
+            yield one_gene, two_genes, have_trait, p
+            return
+        person = people[order[k]]
+        bit = 1 << index[person["name"]]
+        for count in (0, 1, 2):
+            if person["mother"] is None:
+                gene_p = PROBS["gene"][count]
+            else:
+                gene_p = INHERITANCE[genes[person["mother"]]][genes[person["father"]]][count]
+            if gene_p == 0:
+                continue
+            genes[person["name"]] = count
+            one = one_gene | bit if count == 1 else one_gene
+            two = two_genes | bit if count == 2 else two_genes
+
+            # Known traits are fixed rather than enumerated and rejected
+            traits = (True, False) if person["trait"] is None else (person["trait"],)
+            for trait in traits:
+                trait_p = PROBS["trait"][count][trait]
+                if trait_p == 0:
+                    continue
+                yield from assign(k + 1, one, two, have_trait | bit if trait else have_trait, p * gene_p * trait_p)
+
+    yield from assign(0, 0, 0, 0, 1)
+
+
+def parents_first(people):
+    """
+    Return the names of `people` ordered so everyone comes after their parents.
+    """
+    order = []
+    placed = set()
+
+    def place(name):
+        if name in placed:
+            return
+        placed.add(name)
+        for parent in (people[name]["mother"], people[name]["father"]):
+            if parent is not None:
+                place(parent)
+        order.append(name)
+
+    for name in people:
+        place(name)
+    return order
+
+
 def powerset(s):
     """
     Return a list of all possible subsets of set s.
@@ -138,150 +225,22 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    joint_probability = 1  
-    for item in people.keys():
-        person = people[item]
-        #print(person)
-        # If person is in the one_gene set
-        if person["name"] in one_gene:
-            if person['mother'] is None and person['father'] is None:
-                joint_probability = joint_probability * (PROBS["gene"][1] * PROBS["trait"][1][person["name"] in have_trait])
-            else:
-                prob = float(1)
-                mother = person['mother']
-                father = person['father']
-                #Mother has Zero Genes
-                if mother not in one_gene and mother not in two_genes:
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = prob * (PROBS["mutation"] * 0.5 + (1-PROBS["mutation"]) * 0.5)
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = prob * (PROBS["mutation"] * PROBS["mutation"] + (1-PROBS["mutation"]) * (1 - PROBS["mutation"])) 
-                    #Father has Zero Genes    
-                    else:
-                        prob = prob * (1-PROBS["mutation"] * PROBS["mutation"] + (1-PROBS["mutation"]) * PROBS["mutation"])
-
-                #Mother has One Gene
-                if mother in one_gene and mother not in two_genes:
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = prob * (0.5 * 0.5 + 0.5 * 0.5)
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = prob * (0.5 * PROBS['mutation'] + 0.5 * (1-PROBS['mutation']))
-                    #Father has Zero Gene    
-                    else:
-                        prob = prob * (PROBS['mutation'] * 0.5 + (1-PROBS['mutation'] * 0.5))
-
-                #Mother has Two Genes
-                if (mother not in one_gene and mother in two_genes):
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = prob* (PROBS['mutation'] * 0.5)
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = prob * (PROBS['mutation'] * PROBS['mutation'])
-                    #Father has Zero Gene    
-                    else:
-                        prob = prob * (PROBS['mutation'] * (1-PROBS['mutation']) + PROBS['mutation'] * (1-PROBS['mutation']))
-
-                joint_probability = joint_probability * (prob * PROBS["trait"][1][person["name"] in have_trait])          
-
-        # Or person is in the two_genes set        
-        elif person["name"] in two_genes:
-            if person['mother'] is None and person['father'] is None:
-                joint_probability = joint_probability * (PROBS["gene"][2] * PROBS["trait"][2][person["name"] in have_trait])
-            else:
-                prob = float(1)
-                mother = person['mother']
-                father = person['father']
-                #Mother has Zero Genes
-                if mother not in one_gene and mother not in two_genes:
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = prob * (PROBS["mutation"] * 0.5)
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = prob * (PROBS["mutation"] * PROBS["mutation"]) 
-                    #Father has Zero Genes    
-                    else:
-                        prob = prob * (PROBS["mutation"] * (1-PROBS["mutation"]))
-
-                #Mother has One Gene
-                if mother in one_gene and mother not in two_genes:
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = prob * (0.5 * 0.5)
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = prob * (0.5 * (1-PROBS['mutation']))
-                    #Father has Zero Gene    
-                    else:
-                        prob = prob * (PROBS['mutation'] * 0.5)
-
-                #Mother has Two Genes
-                if (mother not in one_gene and mother in two_genes):
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = prob * (0.5 * PROBS['mutation']+ 0.5 * (1-PROBS['mutation']))
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = prob * (PROBS['mutation'] * (1-PROBS['mutation']) + PROBS['mutation'] * (1-PROBS['mutation']))
-                    #Father has Zero Gene    
-                    else:
-                        prob = prob * (PROBS['mutation'] * PROBS['mutation'] + (1-PROBS['mutation']) * (1-PROBS['mutation']))
-
-                joint_probability = joint_probability * (prob * PROBS["trait"][2][person["name"] in have_trait])          
-                
-        # Or neither in one_gene and two_genes        
+    joint_probability = 1
+    for person in people.values():
+        name = person["name"]
+        genes = 1 if name in one_gene else 2 if name in two_genes else 0
+        if person["mother"] is None and person["father"] is None:
+            joint_probability *= PROBS["gene"][genes]
         else:
-            if person['mother'] is None and person['father'] is None:
-                joint_probability = joint_probability * (PROBS["gene"][0] * PROBS["trait"][0][person["name"] in have_trait])
-            else:
-                prob = float(1)
-                mother = person['mother']
-                father = person['father']
-                #Mother has Zero Genes
-                if mother not in one_gene and mother not in two_genes:
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = (1-PROBS['mutation']) * 0.5
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = (1-PROBS['mutation']) * PROBS['mutation']
-                    #Father has Zero Gene    
-                    else:
-                        prob = (1-PROBS['mutation']) * (1-PROBS['mutation'])
-
-                #Mother has One Gene
-                if mother in one_gene and mother not in two_genes:
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = 0.5 * 0.5
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = 0.5 * PROBS['mutation']
-                    #Father has Zero Gene
-                    else:
-                        prob = 0.5 * (1-PROBS['mutation'])
-
-                #Mother has Two Genes
-                if (mother not in one_gene and mother in two_genes):
-                    #Father has One Gene
-                    if father in one_gene:
-                        prob = PROBS['mutation'] * 0.5
-                    #Father has Two Genes    
-                    elif father in two_genes:
-                        prob = PROBS['mutation'] * PROBS['mutation']
-                    #Father has Zero Gene    
-                    else:
-                        prob = PROBS['mutation'] * (1-PROBS['mutation'])    
-
-                joint_probability = joint_probability * (prob * PROBS["trait"][0][person["name"] in have_trait])                             
-    #print(joint_probability)    
+            mother = person["mother"]
+            father = person["father"]
+            mother_genes = 1 if mother in one_gene else 2 if mother in two_genes else 0
+            father_genes = 1 if father in one_gene else 2 if father in two_genes else 0
+            joint_probability *= INHERITANCE[mother_genes][father_genes][genes]
+        joint_probability *= PROBS["trait"][genes][name in have_trait]
     return joint_probability
 
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
     Add to `probabilities` a new joint probability `p`.
@@ -302,6 +261,18 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
             probabilities[person]["trait"][False] = probabilities[person]["trait"][False] + p        
 
 
+def update_masks(probabilities, names, one_gene, two_genes, have_trait, p):
+    """
+    Add to `probabilities` a new joint probability `p`, like update,
+    for gene and trait sets given as bitmasks over `names`.
+    """
+    for i, person in enumerate(names):
+        bit = 1 << i
+        genes = 1 if one_gene & bit else 2 if two_genes & bit else 0
+        probabilities[person]["gene"][genes] += p
+        probabilities[person]["trait"][bool(have_trait & bit)] += p
+
+
 def normalize(probabilities):
     """
     Update `probabilities` such that each probability distribution
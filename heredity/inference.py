@@ -0,0 +1,252 @@
+import string
+import sys
+
+import numpy as np
+
+from heredity import INHERITANCE, PROBS, load_data, print_probabilities
+
+# Subscript letters for numpy.einsum, one per variable of a factor
+LETTERS = string.ascii_letters
+
+# Most variables in one clique, whose table has 3 ** MAX_CLIQUE entries
+MAX_CLIQUE = 12
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python inference.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(people, infer(people))
+
+
+def trait_likelihood(person):
+    """
+    Return the probability of a person's known trait for 0, 1 and 2
+    copies of the gene, or ones if their trait is unknown.
+    """
+    if person["trait"] is None:
+        return np.ones(3)
+    return np.array([PROBS["trait"][genes][person["trait"]] for genes in range(3)])
+
+
+def pedigree_factors(people, names):
+    """
+    Return a list of (scope, table) factors over the gene counts of
+    `names` (numbered by position), whose product is the joint probability
+    of everyone's genes and known traits: a prior for each person without
+    parents, and an inheritance table for each person with them.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    prior = np.array([PROBS["gene"][genes] for genes in range(3)])
+    table = np.array(INHERITANCE)
+    factors = []
+    for name in names:
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            factors.append(((index[name],), prior * trait_likelihood(person)))
+        elif person["mother"] is None or person["father"] is None:
+            raise ValueError(f"{name} must have both parents or neither")
+        else:
+            scope = (index[person["mother"]], index[person["father"]], index[name])
+            factors.append((scope, table * trait_likelihood(person)))
+    return factors
+
+
+def joint_probabilities(people, names, genes, traits):
+    """
+    Return the joint probability of each of many assignments at once, like
+    heredity.joint_probability, where row k of the int array `genes` holds
+    the gene counts and row k of the bool array `traits` whether each of
+    `names` (by column) has the trait in the k-th assignment.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    founders, children = [], []
+    for name in names:
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            founders.append(index[name])
+        elif person["mother"] is None or person["father"] is None:
+            raise ValueError(f"{name} must have both parents or neither")
+        else:
+            children.append(index[name])
+    mothers = [index[people[names[i]]["mother"]] for i in children]
+    fathers = [index[people[names[i]]["father"]] for i in children]
+
+    prior = np.array([PROBS["gene"][g] for g in range(3)])
+    trait = np.array([[PROBS["trait"][g][False], PROBS["trait"][g][True]] for g in range(3)])
+    table = np.array(INHERITANCE)
+    return (
+        prior[genes[:, founders]].prod(axis=1)
+        * table[genes[:, mothers], genes[:, fathers], genes[:, children]].prod(axis=1)
+        * trait[genes, traits.astype(int)].prod(axis=1)
+    )
+
+
+def elimination_order(n, factors):
+    """
+    Return an order in which to eliminate `n` variables, greedily picking
+    the one whose elimination adds the fewest new edges between the
+    variables that share a factor (min-fill), breaking ties by fewest
+    neighbors.
+    """
+    neighbors = [set() for _ in range(n)]
+    for scope, _ in factors:
+        for v in scope:
+            neighbors[v].update(u for u in scope if u != v)
+
+    def cost(v):
+        adjacent = list(neighbors[v])
+        fill = sum(
+            1 for i, u in enumerate(adjacent) for w in adjacent[i + 1:]
+            if w not in neighbors[u]
+        )
+        return fill, len(adjacent)
+
+    costs = {v: cost(v) for v in range(n)}
+    order = []
+    while costs:
+        v = min(costs, key=lambda u: (costs[u], u))
+        order.append(v)
+        del costs[v]
+        adjacent = neighbors[v]
+        for u in adjacent:
+            neighbors[u].update(adjacent - {u})
+            neighbors[u].discard(v)
+
+        # Only variables next to the eliminated one can have a new cost
+        changed = set(adjacent)
+        for u in adjacent:
+            changed.update(neighbors[u])
+        for u in changed:
+            if u in costs:
+                costs[u] = cost(u)
+    return order
+
+
+def contract(factors, output):
+    """
+    Return the product of (scope, table) `factors`, summed over every
+    variable not in `output` and normalized to sum to 1, as a table
+    over `output`.
+    """
+    letters = {}
+    for scope, _ in factors:
+        for v in scope:
+            letters.setdefault(v, LETTERS[len(letters)])
+    subscripts = ",".join("".join(letters[v] for v in scope) for scope, _ in factors)
+    result = np.einsum(subscripts + "->" + "".join(letters[v] for v in output), *(table for _, table in factors))
+    return result / result.sum()
+
+
+class JunctionTree():
+    """
+    A tree of cliques of gene variables built by variable elimination,
+    calibrated by passing messages up and then down the tree so every
+    person's marginal can be read from a single clique.
+
+    Pedigrees are sparse, so cliques stay small; a pedigree that would
+    need a clique of more than MAX_CLIQUE people raises ValueError.
+
+    Clique k holds variable order[k] followed by the neighbors it had when
+    it was eliminated, and its parent is the clique of whichever of those
+    neighbors was eliminated next.
+    """
+
+    def __init__(self, n, factors):
+        order = elimination_order(n, factors)
+        position = {v: k for k, v in enumerate(order)}
+
+        neighbors = [set() for _ in range(n)]
+        for scope, _ in factors:
+            for v in scope:
+                neighbors[v].update(u for u in scope if u != v)
+        self.cliques = []
+        for v in order:
+            if len(neighbors[v]) >= MAX_CLIQUE:
+                raise ValueError("pedigree is too interconnected for exact inference")
+            self.cliques.append((v,) + tuple(sorted(neighbors[v])))
+            for u in neighbors[v]:
+                neighbors[u].update(neighbors[v] - {u})
+                neighbors[u].discard(v)
+
+        self.parents = [
+            min((position[u] for u in clique[1:]), default=None)
+            for clique in self.cliques
+        ]
+        self.children = [[] for _ in order]
+        for k, parent in enumerate(self.parents):
+            if parent is not None:
+                self.children[parent].append(k)
+
+        # Each factor belongs to the clique of its first eliminated variable
+        assigned = [[] for _ in order]
+        for scope, table in factors:
+            assigned[min(position[v] for v in scope)].append((scope, table))
+        self.potentials = [
+            contract([(clique, np.ones((3,) * len(clique)))] + factors, clique)
+            for clique, factors in zip(self.cliques, assigned)
+        ]
+        self.calibrate()
+
+    def calibrate(self):
+        """
+        Pass messages from the leaves up to the roots and back down.
+        """
+        cliques, parents, children = self.cliques, self.parents, self.children
+        self.up = [None] * len(cliques)
+        self.down = [None] * len(cliques)
+
+        # Children are always eliminated before their parents
+        for k, clique in enumerate(cliques):
+            incoming = [(cliques[c][1:], self.up[c]) for c in children[k]]
+            self.up[k] = contract([(clique, self.potentials[k])] + incoming, clique[1:])
+
+        for k in reversed(range(len(cliques))):
+            incoming = [(cliques[c][1:], self.up[c]) for c in children[k]]
+            if parents[k] is not None:
+                incoming.append((cliques[k][1:], self.down[k]))
+            for i, c in enumerate(children[k]):
+                others = incoming[:i] + incoming[i + 1:]
+                self.down[c] = contract([(cliques[k], self.potentials[k])] + others, cliques[c][1:])
+
+    def marginal(self, k):
+        """
+        Return the distribution of the variable eliminated k-th,
+        given all the evidence.
+        """
+        clique = self.cliques[k]
+        incoming = [(self.cliques[c][1:], self.up[c]) for c in self.children[k]]
+        if self.parents[k] is not None:
+            incoming.append((clique[1:], self.down[k]))
+        return contract([(clique, self.potentials[k])] + incoming, clique[:1])
+
+
+def infer(people):
+    """
+    Return the exact gene and trait distribution of everyone in `people`,
+    in the same form as the `probabilities` of heredity.main, by building
+    and calibrating a junction tree over the pedigree.
+    """
+    names = list(people)
+    tree = JunctionTree(len(names), pedigree_factors(people, names))
+
+    probabilities = {}
+    for k, clique in enumerate(tree.cliques):
+        name = names[clique[0]]
+        genes = tree.marginal(k)
+        trait = people[name]["trait"]
+        if trait is None:
+            has_trait = sum(genes[g] * PROBS["trait"][g][True] for g in range(3))
+        else:
+            has_trait = 1.0 if trait else 0.0
+        probabilities[name] = {
+            "gene": {2: float(genes[2]), 1: float(genes[1]), 0: float(genes[0])},
+            "trait": {True: float(has_trait), False: float(1 - has_trait)}
+        }
+    return {name: probabilities[name] for name in names}
+
+
+if __name__ == "__main__":
+    main()
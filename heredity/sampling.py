@@ -0,0 +1,422 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from heredity import INHERITANCE, PROBS, load_data, parents_first, print_probabilities
+
+# Samples drawn when neither a sample nor a time budget is given
+SAMPLES = 100000
+
+# Samples drawn between checks of the time budget
+BATCH = 1000
+
+# Gibbs chains run side by side, and sweeps of each discarded at the start
+CHAINS = 4
+BURN_IN = 100
+
+# Largest R-hat over all estimates before a Gibbs run counts as unconverged
+MAX_R_HAT = 1.05
+
+# Fewest effective samples before likelihood weights count as degenerate
+MIN_EFFECTIVE_SAMPLES = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate gene and trait probabilities by sampling.")
+    parser.add_argument("data")
+    parser.add_argument("--method", choices=sorted(METHODS), default="gibbs")
+    parser.add_argument("--samples", type=int, help=f"samples to draw (default: {SAMPLES} without --seconds)")
+    parser.add_argument("--seconds", type=float, help="stop drawing samples after this long")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--chains", type=int, default=CHAINS, help="Gibbs chains")
+    parser.add_argument("--burn-in", type=int, default=BURN_IN, help="Gibbs sweeps discarded from each chain")
+    args = parser.parse_args()
+
+    people = load_data(args.data)
+    options = {"chains": args.chains, "burn_in": args.burn_in} if args.method == "gibbs" else {}
+    probabilities, errors, diagnostics = METHODS[args.method](
+        people, args.samples, args.seconds, args.seed, **options
+    )
+    print_probabilities(people, probabilities, errors)
+    report(diagnostics)
+
+
+def report(diagnostics):
+    """
+    Print a run's convergence diagnostics to stderr, away from the results.
+    """
+    print(", ".join(f"{key}: {value:.4g}" if isinstance(value, float) else f"{key}: {value}"
+                    for key, value in diagnostics.items()), file=sys.stderr)
+    if diagnostics.get("r_hat", 1) > MAX_R_HAT:
+        print(f"Warning: R-hat is above {MAX_R_HAT}, so the chains have not mixed; draw more samples",
+              file=sys.stderr)
+    if diagnostics.get("effective_samples", MIN_EFFECTIVE_SAMPLES) < MIN_EFFECTIVE_SAMPLES:
+        print(f"Warning: fewer than {MIN_EFFECTIVE_SAMPLES} effective samples, so the evidence "
+              "is too unlikely for likelihood weighting; try --method gibbs", file=sys.stderr)
+
+
+def pedigree_arrays(people, names):
+    """
+    Return (founders, children, mothers, fathers, likelihoods) for `names`
+    (numbered by position): the numbers of the people without parents and
+    with them, the numbers of the children's parents, and an N x 3 array of
+    the probability of each person's known trait given 0, 1 or 2 copies of
+    the gene, or ones where the trait is unknown.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    founders, children = [], []
+    for name in names:
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            founders.append(index[name])
+        elif person["mother"] is None or person["father"] is None:
+            raise ValueError(f"{name} must have both parents or neither")
+        else:
+            children.append(index[name])
+    mothers = [index[people[names[i]]["mother"]] for i in children]
+    fathers = [index[people[names[i]]["father"]] for i in children]
+
+    likelihoods = np.ones((len(names), 3))
+    for i, name in enumerate(names):
+        if people[name]["trait"] is not None:
+            likelihoods[i] = [PROBS["trait"][genes][people[name]["trait"]] for genes in range(3)]
+    return (np.array(founders, dtype=int), np.array(children, dtype=int),
+            np.array(mothers, dtype=int), np.array(fathers, dtype=int), likelihoods)
+
+
+def trait_values(people, names):
+    """
+    Return an N x 3 array of the chance that each person has the trait
+    given 0, 1 or 2 copies of the gene, which is 1 or 0 if it is known.
+    """
+    values = np.empty((len(names), 3))
+    for i, name in enumerate(names):
+        trait = people[name]["trait"]
+        if trait is None:
+            values[i] = [PROBS["trait"][genes][True] for genes in range(3)]
+        else:
+            values[i] = float(trait)
+    return values
+
+
+def draw(rng, distributions):
+    """
+    Return a gene count drawn from each of an array of (unnormalized)
+    distributions over 0, 1 and 2 copies along its last axis.
+    """
+    cumulative = np.cumsum(distributions, axis=-1)
+    u = rng.random(distributions.shape[:-1]) * cumulative[..., -1]
+    return (u[..., None] >= cumulative[..., :2]).sum(axis=-1)
+
+
+def estimates(distributions, traits):
+    """
+    Return an ... x N x 4 array of the estimates each sample gives: the
+    chance of 0, 1 and 2 copies of the gene and of having the trait, from
+    an ... x N x 3 array of gene distributions (one-hot if sampled).
+    """
+    return np.concatenate([distributions, (distributions * traits).sum(axis=-1, keepdims=True)], axis=-1)
+
+
+def as_probabilities(names, values):
+    """
+    Return an N x 4 array of estimates, as ordered by `estimates`, as
+    a dictionary in the form of the `probabilities` of heredity.main.
+    """
+    return {
+        name: {
+            "gene": {2: float(row[2]), 1: float(row[1]), 0: float(row[0])},
+            "trait": {True: float(row[3]), False: float(1 - row[3])}
+        }
+        for name, row in zip(names, values)
+    }
+
+
+def as_errors(names, errors):
+    """
+    Return standard errors of estimates as a dictionary like as_probabilities,
+    where having and not having the trait share an error.
+    """
+    return {
+        name: {
+            "gene": {2: float(row[2]), 1: float(row[1]), 0: float(row[0])},
+            "trait": {True: float(row[3]), False: float(row[3])}
+        }
+        for name, row in zip(names, errors)
+    }
+
+
+def budget(samples, seconds):
+    """
+    Return a function of the samples drawn so far that says how many to
+    draw in the next batch, or 0 once the sample or time budget is spent.
+    """
+    if samples is None and seconds is None:
+        samples = SAMPLES
+    deadline = None if seconds is None else time.perf_counter() + seconds
+
+    def remaining(drawn):
+        if deadline is not None and time.perf_counter() >= deadline:
+            return 0
+        if samples is None:
+            return BATCH
+        return max(0, min(BATCH, samples - drawn))
+
+    return remaining
+
+
+def likelihood_weighting(people, samples=None, seconds=None, seed=None):
+    """
+    Return (probabilities, errors, diagnostics) estimated by likelihood
+    weighting: gene counts are drawn parents first from the model, and each
+    sample is weighted by the probability of the known traits given its
+    genes. Unknown traits are not drawn; their chance given each sample's
+    genes is averaged instead.
+
+    Draws `samples` samples, or as many as fit in `seconds`, or SAMPLES.
+    Errors are the delta-method standard errors of the weighted means, and
+    the diagnostics include the effective sample size of the weights, which
+    falls far below the samples drawn when the evidence is unlikely.
+    """
+    rng = np.random.default_rng(seed)
+    names = parents_first(people)
+    founders, children, mothers, fathers, likelihoods = pedigree_arrays(people, names)
+    traits = trait_values(people, names)
+    prior = np.array([PROBS["gene"][genes] for genes in range(3)])
+    table = np.array(INHERITANCE)
+    log_likelihoods = np.log(likelihoods)
+    identity = np.eye(3)
+
+    # Weights are kept relative to the largest log weight so far, to avoid underflow
+    shift = -np.inf
+    total = square = 0.0
+    weighted = np.zeros((len(names), 4))
+    weighted_square = np.zeros((len(names), 4))
+    weighted_moment = np.zeros((len(names), 4))
+
+    remaining = budget(samples, seconds)
+    drawn = 0
+    while (size := remaining(drawn)):
+        genes = np.empty((size, len(names)), dtype=int)
+        genes[:, founders] = draw(rng, np.broadcast_to(prior, (size, len(founders), 3)))
+
+        # Parents come first, so a child's parents are drawn before them
+        for i, mother, father in zip(children, mothers, fathers):
+            genes[:, i] = draw(rng, table[genes[:, mother], genes[:, father]])
+
+        log_weights = log_likelihoods[np.arange(len(names)), genes].sum(axis=1)
+        new_shift = max(shift, log_weights.max())
+        if np.isfinite(shift):
+            scale = np.exp(shift - new_shift)
+            total *= scale
+            square *= scale ** 2
+            weighted *= scale
+            weighted_square *= scale ** 2
+            weighted_moment *= scale ** 2
+        shift = new_shift
+        weights = np.exp(log_weights - shift)
+
+        values = estimates(identity[genes], traits)
+        total += weights.sum()
+        square += (weights ** 2).sum()
+        weighted += np.einsum("k,kni->ni", weights, values)
+        weighted_square += np.einsum("k,kni->ni", weights ** 2, values)
+        weighted_moment += np.einsum("k,kni->ni", weights ** 2, values ** 2)
+        drawn += size
+
+    if drawn == 0:
+        raise ValueError("no samples were drawn within the budget")
+    means = weighted / total
+    variances = (weighted_moment - 2 * means * weighted_square + means ** 2 * square) / total ** 2
+    errors = np.sqrt(np.maximum(variances, 0))
+    diagnostics = {"method": "likelihood-weighting", "samples": drawn, "effective_samples": float(total ** 2 / square)}
+    return _in_order(people, names, means, errors, diagnostics)
+
+
+def coloring(people, names):
+    """
+    Return lists of the numbers of `names` such that no two people in a
+    list share a factor of the model (a parent and child, or two parents
+    of a child), so everyone in a list can be resampled at once.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    neighbors = [set() for _ in names]
+    for name in names:
+        person = people[name]
+        if person["mother"] is not None:
+            scope = [index[person["mother"]], index[person["father"]], index[name]]
+            for v in scope:
+                neighbors[v].update(u for u in scope if u != v)
+
+    colors = {}
+    for v in sorted(range(len(names)), key=lambda v: -len(neighbors[v])):
+        used = {colors[u] for u in neighbors[v] if u in colors}
+        colors[v] = next(color for color in range(len(names)) if color not in used)
+    groups = [[] for _ in range(max(colors.values(), default=-1) + 1)]
+    for v in range(len(names)):
+        groups[colors[v]].append(v)
+    return groups
+
+
+class GibbsGroup():
+    """
+    The people resampled together in one step of a Gibbs sweep, with the
+    factors of the model each of them is in, as arrays of person numbers.
+    """
+
+    def __init__(self, members, people, names):
+        index = {name: i for i, name in enumerate(names)}
+        position = {v: k for k, v in enumerate(members)}
+        self.members = np.array(members, dtype=int)
+        self.founders = np.array([k for k, v in enumerate(members) if people[names[v]]["mother"] is None], dtype=int)
+        with_parents = [k for k, v in enumerate(members) if people[names[v]]["mother"] is not None]
+        self.with_parents = np.array(with_parents, dtype=int)
+        self.mothers = np.array([index[people[names[members[k]]]["mother"]] for k in with_parents], dtype=int)
+        self.fathers = np.array([index[people[names[members[k]]]["father"]] for k in with_parents], dtype=int)
+
+        # Children of members, by which parent the member is
+        self.children = {"mother": ([], [], []), "father": ([], [], [])}
+        for name in names:
+            person = people[name]
+            for role, other in (("mother", "father"), ("father", "mother")):
+                parent = person[role]
+                if parent is not None and index[parent] in position:
+                    positions, kids, others = self.children[role]
+                    positions.append(position[index[parent]])
+                    kids.append(index[name])
+                    others.append(index[person[other]])
+        self.children = {
+            role: tuple(np.array(column, dtype=int) for column in columns)
+            for role, columns in self.children.items()
+        }
+
+    def conditionals(self, genes, log_prior, log_table, log_likelihoods):
+        """
+        Return the C x K x 3 distributions of each member's gene count given
+        everyone else's, for the C x N array `genes` of every chain.
+        """
+        logits = np.broadcast_to(log_likelihoods[self.members], (len(genes), len(self.members), 3)).copy()
+        logits[:, self.founders] += log_prior
+        logits[:, self.with_parents] += log_table[genes[:, self.mothers], genes[:, self.fathers]]
+
+        positions, kids, others = self.children["mother"]
+        np.add.at(logits, (slice(None), positions), log_table[:, genes[:, others], genes[:, kids]].transpose(1, 2, 0))
+        positions, kids, others = self.children["father"]
+        np.add.at(logits, (slice(None), positions), log_table[genes[:, others], :, genes[:, kids]])
+
+        distributions = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return distributions / distributions.sum(axis=-1, keepdims=True)
+
+
+def gibbs_sampling(people, samples=None, seconds=None, seed=None, chains=CHAINS, burn_in=BURN_IN):
+    """
+    Return (probabilities, errors, diagnostics) estimated by Gibbs sampling:
+    `chains` chains start from gene counts drawn from the model and then
+    repeatedly sweep the pedigree, redrawing each person's gene count given
+    everyone else's. People that share no factor are redrawn together.
+
+    Each sweep after the first `burn_in` of every chain counts as a sample,
+    and contributes the distributions each person was redrawn from rather
+    than just the gene count drawn. Draws `samples` samples across all the
+    chains, or as many as fit in `seconds`, or SAMPLES.
+
+    Errors are standard errors over means of equal batches of sweeps in
+    each chain, and the diagnostics include the largest R-hat over all
+    estimates, which is close to 1 once the chains agree.
+    """
+    if chains < 2:
+        raise ValueError("Gibbs sampling needs at least 2 chains for its diagnostics")
+    rng = np.random.default_rng(seed)
+    names = list(people)
+    _, _, _, _, likelihoods = pedigree_arrays(people, names)
+    traits = trait_values(people, names)
+    log_prior = np.log([PROBS["gene"][genes] for genes in range(3)])
+    log_table = np.log(INHERITANCE)
+    log_likelihoods = np.log(likelihoods)
+    groups = [GibbsGroup(members, people, names) for members in coloring(people, names)]
+
+    # Start each chain from a draw of the model, ignoring the evidence
+    index = {name: i for i, name in enumerate(names)}
+    genes = np.empty((chains, len(names)), dtype=int)
+    for name in parents_first(people):
+        person = people[name]
+        if person["mother"] is None:
+            genes[:, index[name]] = draw(rng, np.broadcast_to(np.exp(log_prior), (chains, 3)))
+        else:
+            parents = np.exp(log_table[genes[:, index[person["mother"]]], genes[:, index[person["father"]]]])
+            genes[:, index[name]] = draw(rng, parents)
+
+    def sweep():
+        distributions = np.empty((chains, len(names), 3))
+        for group in groups:
+            conditional = group.conditionals(genes, log_prior, log_table, log_likelihoods)
+            distributions[:, group.members] = conditional
+            genes[:, group.members] = draw(rng, conditional)
+        return distributions
+
+    for _ in range(burn_in):
+        sweep()
+
+    # Means of each batch of sweeps, chain by chain
+    batches, sizes = [], []
+    remaining = budget(samples, seconds)
+    drawn = 0
+    while (size := remaining(drawn) // chains):
+        batch = np.zeros((chains, len(names), 4))
+        for _ in range(size):
+            batch += estimates(sweep(), traits)
+        batches.append(batch / size)
+        sizes.append(size)
+        drawn += size * chains
+
+    if drawn == 0:
+        raise ValueError("no samples were drawn within the budget")
+    batches, sizes = np.array(batches), np.array(sizes)
+    means = np.einsum("b,bcni->ni", sizes, batches) / (sizes.sum() * chains)
+
+    # A last batch cut short by the sample budget is left out of the errors
+    complete = batches[sizes == sizes.max()]
+    count = len(complete) * chains
+    errors = complete.reshape(count, len(names), 4).std(axis=0, ddof=1) / np.sqrt(count)
+    diagnostics = {"method": "gibbs", "samples": drawn, "chains": chains, "burn_in": burn_in,
+                   "r_hat": r_hat(complete)}
+    return _in_order(people, names, means, errors, diagnostics)
+
+
+def r_hat(batches):
+    """
+    Return the largest Gelman-Rubin R-hat over all estimates, from a
+    B x C x N x 4 array of the means of B batches of each of C chains,
+    or 1 when there are too few batches to tell.
+    """
+    if len(batches) < 2:
+        return 1.0
+    n = len(batches)
+    chain_means = batches.mean(axis=0)
+    within = batches.var(axis=0, ddof=1).mean(axis=0)
+    between = n * chain_means.var(axis=0, ddof=1)
+    pooled = (n - 1) / n * within + between / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.sqrt(pooled / within)
+
+    # Estimates that never vary, like known traits, have converged
+    ratios[within == 0] = 1.0
+    return float(ratios.max())
+
+
+def _in_order(people, names, means, errors, diagnostics):
+    index = {name: i for i, name in enumerate(names)}
+    order = [index[name] for name in people]
+    return (as_probabilities(people, means[order]), as_errors(people, errors[order]), diagnostics)
+
+
+METHODS = {
+    "gibbs": gibbs_sampling,
+    "weighting": likelihood_weighting,
+}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import itertools
+import sys
+
+import numpy as np
+
+from heredity import INHERITANCE, PROBS, joint_probability, load_data
+from inference import joint_probabilities
+
+# Largest relative difference allowed from the reference probabilities
+TOLERANCE = 1e-12
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python validate.py data.csv [data.csv ...]")
+    reference = reference_inheritance(PROBS["mutation"])
+    difference = max(
+        abs(INHERITANCE[mother][father][child] - p) for (mother, father, child), p in reference.items()
+    ) / max(reference.values())
+    failed = report("inheritance table", len(reference), difference)
+    for filename in sys.argv[1:]:
+        count, differences = compare(load_data(filename), reference)
+        for function, difference in differences.items():
+            failed = report(f"{filename} {function}", count, difference) or failed
+    if failed:
+        sys.exit(1)
+
+
+def report(label, count, difference):
+    """
+    Print how far `count` values are from the reference, and return
+    whether that is too far.
+    """
+    failed = difference > TOLERANCE
+    print(f"{label}: {count} values, largest relative difference {difference:.2e} "
+          f"{'FAILED' if failed else 'ok'}")
+    return failed
+
+
+def reference_inheritance(mutation):
+    """
+    Return a dictionary mapping (mother, father, child) gene counts to the
+    probability of the child having that many copies, written out case by
+    case from the chance `mutation` that a gene mutates, independently
+    of heredity.inheritance_table.
+
+    A parent with 0 copies passes the gene on only by mutation, with 2
+    copies unless it mutates, and with 1 copy half the time either way.
+    """
+    m, k = mutation, 1 - mutation
+    return {
+        # Child with no copies: neither parent passes the gene on
+        (0, 0, 0): k * k, (0, 1, 0): k * 0.5, (0, 2, 0): k * m,
+        (1, 0, 0): 0.5 * k, (1, 1, 0): 0.25, (1, 2, 0): 0.5 * m,
+        (2, 0, 0): m * k, (2, 1, 0): m * 0.5, (2, 2, 0): m * m,
+
+        # Child with one copy: exactly one parent passes the gene on
+        (0, 0, 1): m * k + k * m, (0, 1, 1): m * 0.5 + k * 0.5, (0, 2, 1): m * m + k * k,
+        (1, 0, 1): 0.5 * k + 0.5 * m, (1, 1, 1): 0.5, (1, 2, 1): 0.5 * m + 0.5 * k,
+        (2, 0, 1): k * k + m * m, (2, 1, 1): k * 0.5 + m * 0.5, (2, 2, 1): k * m + m * k,
+
+        # Child with two copies: both parents pass the gene on
+        (0, 0, 2): m * m, (0, 1, 2): m * 0.5, (0, 2, 2): m * k,
+        (1, 0, 2): 0.5 * m, (1, 1, 2): 0.25, (1, 2, 2): 0.5 * k,
+        (2, 0, 2): k * m, (2, 1, 2): k * 0.5, (2, 2, 2): k * k,
+    }
+
+
+def reference_joint_probability(people, names, genes, traits, reference):
+    """
+    Return the joint probability of one assignment of gene counts `genes`
+    and traits `traits` to `names`, using the `reference` inheritance
+    probabilities rather than heredity.INHERITANCE.
+    """
+    count = dict(zip(names, genes))
+    p = 1
+    for name, has_trait in zip(names, traits):
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            p *= PROBS["gene"][count[name]]
+        else:
+            p *= reference[count[person["mother"]], count[person["father"]], count[name]]
+        p *= PROBS["trait"][count[name]][bool(has_trait)]
+    return p
+
+
+def compare(people, reference):
+    """
+    Compute the joint probability of every assignment of genes and traits
+    to `people` with the reference, heredity.joint_probability and the
+    vectorized inference.joint_probabilities. Return the number of
+    assignments and a dictionary of the largest difference of each
+    function from the reference, relative to the largest joint probability.
+    """
+    names = list(people)
+    genes = np.array(list(itertools.product(range(3), repeat=len(names))))
+    traits = np.array(list(itertools.product([False, True], repeat=len(names))))
+    genes, traits = np.repeat(genes, len(traits), axis=0), np.tile(traits, (len(genes), 1))
+
+    expected = np.array([
+        reference_joint_probability(people, names, row, has_trait, reference)
+        for row, has_trait in zip(genes, traits)
+    ])
+    scalar = np.array([
+        joint_probability(
+            people,
+            {name for name, count in zip(names, row) if count == 1},
+            {name for name, count in zip(names, row) if count == 2},
+            {name for name, trait in zip(names, has_trait) if trait}
+        )
+        for row, has_trait in zip(genes, traits)
+    ])
+    vectorized = joint_probabilities(people, names, genes, traits)
+    return len(expected), {
+        "joint_probability": float(np.abs(scalar - expected).max() / expected.max()),
+        "joint_probabilities": float(np.abs(vectorized - expected).max() / expected.max()),
+    }
+
+
+if __name__ == "__main__":
+    main()
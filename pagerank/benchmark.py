@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import pagerank
+from matrix import TOLERANCE, LinkMatrix, power_iteration
+from outofcore import outofcore_power_iteration, write_edges
+from sampler import vector_sample_pagerank
+from threaded import threaded_power_iteration
+
+# Bump whenever the layout of the results file changes
+VERSION = 2
+
+# Tolerance of the power iteration every engine is compared against
+REFERENCE_TOLERANCE = 1e-14
+
+# Samples taken by the vectorized sampler
+VECTOR_SAMPLES = 10 ** 6
+
+# Largest corpus each slow engine is run on
+LIMITS = {
+    "sample": 1000,
+    "iterate": 100000,
+    "gauss-seidel": 100000,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the PageRank engines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    engines = commands.add_parser("engines", help="run every engine on synthetic corpora")
+    engines.add_argument("--graphs", nargs="+", choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    engines.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    engines.add_argument("--links", type=float, default=10, help="average links per page")
+    engines.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    engines.add_argument("--seed", type=int, default=0)
+    engines.add_argument("--no-memory", action="store_true", help="skip the traced run measuring peak memory")
+    engines.add_argument("--output", default="benchmark.json")
+
+    scaling = commands.add_parser("scaling", help="measure threaded power iteration across worker counts")
+    scaling.add_argument("--graph", choices=sorted(GENERATORS), default="power-law")
+    scaling.add_argument("--size", type=int, default=10 ** 6)
+    scaling.add_argument("--links", type=float, default=10, help="average links per page")
+    scaling.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    scaling.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "engines":
+        benchmark_engines(args.graphs, args.sizes, args.links, args.engines, args.seed,
+                          not args.no_memory, args.output)
+    elif args.command == "scaling":
+        benchmark_scaling(args.graph, args.size, args.links, args.workers, args.seed)
+
+
+def erdos_renyi(n, links, rng):
+    """
+    Returns a corpus where every page links to about `links` pages
+    chosen uniformly at random.
+    """
+    counts = rng.poisson(links, n)
+    return _corpus(n, counts, lambda count: rng.integers(n, size=count))
+
+
+def power_law(n, links, rng, exponent=1.1):
+    """
+    Returns a corpus where the chance of a page being linked to falls
+    off as a power of its popularity rank, and the number of links on
+    a page is heavy-tailed, as on the web.
+    """
+    weights = 1 / np.arange(1, n + 1) ** exponent
+    popularity = rng.permutation(n)
+    cumulative = np.cumsum(weights / weights.sum())
+    counts = np.minimum(rng.zipf(2, n) * links / 2.5, n - 1).astype(np.int64)
+
+    def targets(count):
+        return popularity[np.minimum(np.searchsorted(cumulative, rng.random(count)), n - 1)]
+
+    return _corpus(n, counts, targets)
+
+
+def many_dangling(n, links, rng, fraction=0.5):
+    """
+    Returns a corpus like erdos_renyi where `fraction` of the pages
+    have no links at all.
+    """
+    counts = rng.poisson(links, n) * (rng.random(n) >= fraction)
+    return _corpus(n, counts, lambda count: rng.integers(n, size=count))
+
+
+def _corpus(n, counts, targets):
+    names = [f"{i}.html" for i in range(n)]
+    corpus = {}
+    for i, count in enumerate(counts):
+        corpus[names[i]] = set(names[j] for j in targets(count)) - {names[i]}
+    return corpus
+
+
+GENERATORS = {
+    "erdos-renyi": erdos_renyi,
+    "power-law": power_law,
+    "dangling": many_dangling,
+}
+
+
+def run_sample(corpus, damping_factor, seed):
+    random.seed(seed)
+    return pagerank.sample_pagerank(corpus, damping_factor, pagerank.SAMPLES), None
+
+
+def run_iterate(corpus, damping_factor, seed, method="jacobi"):
+    # Stop by the same rule as the NumPy power iterations, not the looser CS50 default
+    iterations = []
+    ranks = pagerank.iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE, norm="l1", method=method,
+                                      telemetry=iterations.append)
+    return ranks, len(iterations)
+
+
+def run_matrix(corpus, damping_factor, seed):
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, iterations = power_iteration(matrix, damping_factor)
+    return matrix.ranks_dict(ranks), iterations
+
+
+def run_threaded(corpus, damping_factor, seed):
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, iterations = threaded_power_iteration(matrix, damping_factor, workers=os.cpu_count())
+    return matrix.ranks_dict(ranks), iterations
+
+
+def run_vector_sample(corpus, damping_factor, seed):
+    return vector_sample_pagerank(corpus, damping_factor, VECTOR_SAMPLES, seed=seed), None
+
+
+def run_outofcore(corpus, damping_factor, seed):
+    directory = tempfile.mkdtemp()
+    try:
+        pages = sorted(corpus)
+        write_edges(pages, (corpus[page] for page in pages), directory)
+        pages, ranks, iterations = outofcore_power_iteration(directory, damping_factor)
+        return dict(zip(pages, ranks.tolist())), iterations
+    finally:
+        shutil.rmtree(directory)
+
+
+ENGINES = {
+    "sample": run_sample,
+    "iterate": run_iterate,
+    "gauss-seidel": lambda corpus, damping_factor, seed: run_iterate(corpus, damping_factor, seed, "gauss-seidel"),
+    "matrix": run_matrix,
+    "threaded": run_threaded,
+    "vector-sample": run_vector_sample,
+    "outofcore": run_outofcore,
+}
+
+
+def run_engine(engine, corpus, seed, trace_memory):
+    """
+    Returns (ranks, iterations, seconds, peak bytes) for one engine,
+    timing an untraced run and then measuring peak memory in a second
+    run under tracemalloc, which would slow the first one down.
+    """
+    start = time.perf_counter()
+    ranks, iterations = ENGINES[engine](corpus, pagerank.DAMPING, seed)
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        ENGINES[engine](corpus, pagerank.DAMPING, seed)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return ranks, iterations, seconds, peak
+
+
+def benchmark_engines(graphs, sizes, links, engines, seed, trace_memory, output):
+    """
+    Run every engine on a corpus of each kind and size, and write the
+    wall time, peak memory, iterations and error against a tight power
+    iteration of each run to `output` as JSON, in a stable order.
+    """
+    results = []
+    print(f"{'graph':<12} {'pages':>8} {'engine':<14} {'seconds':>9} {'peak MB':>9} {'iter':>5} {'L1 error':>10}")
+    for graph in graphs:
+        for n in sizes:
+            corpus = GENERATORS[graph](n, links, np.random.default_rng(seed))
+            matrix = LinkMatrix.from_corpus(corpus)
+            reference, _ = power_iteration(matrix, pagerank.DAMPING, REFERENCE_TOLERANCE)
+            reference = matrix.ranks_dict(reference)
+
+            for engine in engines:
+                result = {
+                    "graph": graph,
+                    "pages": n,
+                    "links": matrix.links.nnz,
+                    "dangling": int(matrix.dangling.sum()),
+                    "engine": engine,
+                }
+                results.append(result)
+                if n > LIMITS.get(engine, n):
+                    result["skipped"] = True
+                    continue
+
+                ranks, iterations, seconds, peak = run_engine(engine, corpus, seed, trace_memory)
+                errors = [abs(ranks[page] - reference[page]) for page in corpus]
+                result.update({
+                    "seconds": _rounded(seconds),
+                    "peak_bytes": peak,
+                    "iterations": iterations,
+                    "l1_error": _rounded(sum(errors)),
+                    "max_error": _rounded(max(errors)),
+                })
+                memory = "-" if peak is None else f"{peak / 1e6:.1f}"
+                print(f"{graph:<12} {n:>8} {engine:<14} {seconds:>9.3f} {memory:>9} "
+                      f"{iterations if iterations is not None else '-':>5} {sum(errors):>10.2e}")
+
+    results.sort(key=lambda result: (result["graph"], result["pages"], result["engine"]))
+    config = {"links": links, "seed": seed, "damping": pagerank.DAMPING, "samples": pagerank.SAMPLES,
+              "vector_samples": VECTOR_SAMPLES, "tolerance": TOLERANCE}
+    with open(output, "w") as f:
+        json.dump({"version": VERSION, "config": config, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def benchmark_scaling(graph, n, links, workers, seed):
+    """
+    Time threaded power iteration on one synthetic corpus at every worker
+    count, checking that every worker count gives exactly the same ranks.
+    """
+    corpus = GENERATORS[graph](n, links, np.random.default_rng(seed))
+    matrix = LinkMatrix.from_corpus(corpus)
+    del corpus
+
+    print(f"{graph}, {n} pages, {matrix.links.nnz} links, {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'seconds':>9} {'iter':>5} {'speedup':>8} {'identical':>9}")
+    baseline = first = None
+    for count in workers:
+        start = time.perf_counter()
+        ranks, iterations = threaded_power_iteration(matrix, pagerank.DAMPING, count)
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline, first = seconds, ranks
+        identical = np.array_equal(ranks, first)
+        print(f"{count:>7} {seconds:>9.3f} {iterations:>5} {baseline / seconds:>8.2f} {str(identical):>9}")
+
+
+def _rounded(value):
+    """
+    Round to 4 significant figures, so results files diff cleanly.
+    """
+    return float(f"{value:.4g}")
+
+
+if __name__ == "__main__":
+    main()
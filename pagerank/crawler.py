@@ -0,0 +1,123 @@
+import argparse
+import multiprocessing
+import os
+import posixpath
+import re
+import time
+
+# Same pattern as pagerank.crawl, over bytes
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Bytes read from a page at a time
+CHUNK_SIZE = 1 << 16
+
+# Longest unfinished tag carried over from one chunk to the next
+MAX_TAG = 1 << 16
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl a corpus of HTML pages in parallel.")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    throughput = {}
+    pages = parallel_crawl(args.directory, args.workers, throughput)
+    links = sum(len(links) for links in pages.values())
+    print(f"Crawled {len(pages)} pages with {links} links in {throughput['seconds']:.2f}s")
+    print(f"  {throughput['pages_per_second']:.0f} pages/sec, {throughput['mb_per_second']:.1f} MB/sec")
+
+
+def html_files(directory):
+    """
+    Yield the path of every HTML page under `directory`, relative to it
+    and with "/" separators, including pages in nested directories.
+    """
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        relative = os.path.relpath(root, directory)
+        for filename in sorted(filenames):
+            if filename.endswith(".html"):
+                yield filename if relative == "." else posixpath.join(*relative.split(os.sep), filename)
+
+
+def page_links(directory, page):
+    """
+    Return (page, links, size) for a page, where `links` are the pages
+    it links to, resolved relative to its directory, and `size` is the
+    number of bytes read.
+
+    The page is read in chunks, so memory use does not grow with its size.
+    """
+    links = set()
+    size = 0
+    carry = b""
+    with open(os.path.join(directory, *page.split("/")), "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            size += len(chunk)
+            text = carry + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+
+            # Keep any tag still open at the end of the chunk for the next one
+            start = text.rfind(b"<", end)
+            carry = text[start:][-MAX_TAG:] if start != -1 else b""
+
+    folder = posixpath.dirname(page)
+    resolved = set()
+    for link in links:
+        link = link.decode(errors="replace")
+        resolved.add(posixpath.normpath(posixpath.join(folder, link)) if folder else link)
+    return page, resolved - {page}, size
+
+
+def _page_links(task):
+    return page_links(*task)
+
+
+def parallel_crawl(directory, workers=None, throughput=None):
+    """
+    Parse a directory of HTML pages, including nested directories,
+    across `workers` processes and check for links to other pages.
+    Return a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page.
+
+    If `throughput` is a dictionary, it is filled in with the pages and
+    bytes read, the seconds taken and the pages and megabytes per second.
+    """
+    start = time.perf_counter()
+    tasks = ((directory, page) for page in html_files(directory))
+    pages = dict()
+    size = 0
+    if workers is not None and workers <= 1:
+        for page, links, page_size in map(_page_links, tasks):
+            pages[page] = links
+            size += page_size
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for page, links, page_size in pool.imap_unordered(_page_links, tasks, chunksize=64):
+                pages[page] = links
+                size += page_size
+
+    # Only include links to other pages in the corpus, in a stable page order
+    pages = {
+        page: set(link for link in pages[page] if link in pages)
+        for page in sorted(pages)
+    }
+
+    if throughput is not None:
+        seconds = time.perf_counter() - start
+        throughput.update({
+            "pages": len(pages),
+            "bytes": size,
+            "seconds": seconds,
+            "pages_per_second": len(pages) / seconds if seconds else 0,
+            "mb_per_second": size / 1e6 / seconds if seconds else 0,
+        })
+    return pages
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from crawler import html_files, page_links
+from matrix import LinkMatrix, power_iteration
+from pagerank import DAMPING
+
+# State file written next to the pages of a corpus
+STATE = "pagerank.state"
+
+# Bump whenever the layout of the state file changes
+VERSION = 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank a corpus, reusing the ranks of the previous run.")
+    parser.add_argument("directory")
+    parser.add_argument("--compare", action="store_true",
+                        help="also solve from a uniform start and report the iterations saved")
+    args = parser.parse_args()
+
+    ranks, report = incremental_pagerank(args.directory, DAMPING, compare=args.compare)
+    print(f"{len(report['added'])} added, {len(report['removed'])} removed, "
+          f"{len(report['modified'])} modified pages")
+    if report["warm"]:
+        print(f"Converged in {report['iterations']} iterations from the previous ranks")
+    else:
+        print(f"Converged in {report['iterations']} iterations from a uniform start")
+    if args.compare:
+        saved = report["cold_iterations"] - report["iterations"]
+        print(f"A uniform start takes {report['cold_iterations']} iterations ({saved} saved)")
+    print(f"PageRank Results from Incremental Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def load_state(directory):
+    """
+    Return the state saved by the last run over `directory`,
+    or None if there is none (or it cannot be read).
+    """
+    try:
+        with open(os.path.join(directory, STATE)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("version") == VERSION else None
+
+
+def save_state(directory, state):
+    """
+    Write `state` for the next run, replacing the old one atomically
+    and carrying on without one if the directory is read-only.
+    """
+    path = os.path.join(directory, STATE)
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+
+def incremental_crawl(directory, files=None):
+    """
+    Crawl `directory` like crawler.parallel_crawl, re-parsing only pages
+    that changed since `files`, the "files" of a previous state.
+
+    A page is unchanged if its size and modification time match, or
+    failing that if its SHA-256 does. Returns (corpus, files, changes)
+    where `changes` has the lists of "added", "removed" and "modified" pages.
+    """
+    files = files or {}
+    found = {}
+    changes = {"added": [], "removed": [], "modified": []}
+    for page in html_files(directory):
+        path = os.path.join(directory, *page.split("/"))
+        stat = os.stat(path)
+        previous = files.get(page)
+        if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+            found[page] = previous
+            continue
+
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if previous and previous["sha256"] == digest:
+            links = previous["links"]
+        else:
+            links = sorted(page_links(directory, page)[1])
+            changes["modified" if previous else "added"].append(page)
+        found[page] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest, "links": links}
+    changes["removed"] = sorted(set(files) - set(found))
+
+    # Only include links to other pages in the corpus
+    corpus = {
+        page: set(link for link in found[page]["links"] if link in found)
+        for page in sorted(found)
+    }
+    return corpus, found, changes
+
+
+def incremental_pagerank(directory, damping_factor, compare=False):
+    """
+    Return (ranks, report) for the corpus in `directory`, starting power
+    iteration from the ranks saved by the previous run when there is one
+    for the same damping factor, and saving the new ranks for the next run.
+
+    `report` has the "added", "removed" and "modified" pages, the
+    "iterations" taken and whether the start was "warm". If `compare`
+    is True it also has "cold_iterations", the iterations needed from
+    a uniform start.
+    """
+    state = load_state(directory)
+    if state is not None and state["damping"] != damping_factor:
+        state = None
+    corpus, files, changes = incremental_crawl(directory, state["files"] if state else None)
+
+    matrix = LinkMatrix.from_corpus(corpus)
+    start = None
+    if state is not None and matrix.pages:
+        # New pages start with the rank every page would have in a uniform start
+        previous = state["ranks"]
+        start = np.array([previous.get(page, 1 / len(matrix)) for page in matrix.pages])
+    ranks, iterations = power_iteration(matrix, damping_factor, start=start)
+
+    report = dict(changes, iterations=iterations, warm=start is not None)
+    if compare:
+        report["cold_iterations"] = power_iteration(matrix, damping_factor)[1]
+
+    save_state(directory, {
+        "version": VERSION,
+        "damping": damping_factor,
+        "files": files,
+        "ranks": matrix.ranks_dict(ranks),
+    })
+    return matrix.ranks_dict(ranks), report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import sys
+
+import numpy as np
+from scipy import sparse
+
+from pagerank import DAMPING, crawl
+
+# Stop once the ranks change by less than this in total (L1 norm)
+TOLERANCE = 1e-10
+
+# Give up on converging after this many iterations
+MAX_ITERATIONS = 1000
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python matrix.py corpus")
+    corpus = crawl(sys.argv[1])
+    ranks = matrix_pagerank(corpus, DAMPING)
+    print(f"PageRank Results from Sparse Matrix")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class LinkMatrix():
+    """
+    The links of a corpus as a sparse column-stochastic matrix.
+
+    Pages are numbered in sorted order, `links[i, j]` is the chance of
+    following a link from page j to page i, and `dangling[j]` is True
+    for pages with no links, which are treated as linking to every page.
+    """
+
+    def __init__(self, pages, links, dangling):
+        self.pages = pages
+        self.links = links
+        self.dangling = dangling
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        counts = np.fromiter((len(corpus[page]) for page in pages), dtype=np.int64, count=len(pages))
+
+        sources = np.repeat(np.arange(len(pages)), counts)
+        targets = np.fromiter(
+            (index[link] for page in pages for link in corpus[page]),
+            dtype=np.int64, count=int(counts.sum())
+        )
+        weights = 1 / counts[sources]
+        links = sparse.csr_matrix((weights, (targets, sources)), shape=(len(pages), len(pages)))
+        return cls(pages, links, counts == 0)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def step(self, ranks, damping_factor):
+        """
+        Returns the ranks after one more step of the random surfer.
+        """
+        n = len(self.pages)
+        spread = ranks[self.dangling].sum() / n
+        return (1 - damping_factor) / n + damping_factor * (self.links @ ranks + spread)
+
+    def ranks_dict(self, ranks):
+        """
+        Returns a rank vector as a dictionary from page name to rank.
+        """
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def power_iteration(matrix, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, start=None):
+    """
+    Return (ranks, iterations): the PageRank vector of a LinkMatrix found
+    by repeatedly stepping from uniform ranks (or from the rank vector
+    `start`) until the L1 change between steps is at most `tolerance`,
+    and how many steps that took.
+    """
+    n = len(matrix)
+    ranks = np.full(n, 1 / n) if start is None else start / start.sum()
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = matrix.step(ranks, damping_factor)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change <= tolerance:
+            break
+    return ranks / ranks.sum(), iteration
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration
+    over a sparse matrix of the corpus's links.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, _ = power_iteration(matrix, damping_factor, tolerance)
+    return matrix.ranks_dict(ranks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from crawler import html_files, page_links
+from matrix import MAX_ITERATIONS, TOLERANCE
+from pagerank import DAMPING
+
+# Bump whenever the layout of an edge list changes
+VERSION = 1
+
+# Edges held in memory at once while writing or streaming an edge list
+BLOCK = 1 << 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank a corpus from an edge list on disk.")
+    parser.add_argument("directory")
+    parser.add_argument("edges", nargs="?", help="where to write the edge list (default: DIRECTORY.edges)")
+    args = parser.parse_args()
+
+    path = args.edges or args.directory.rstrip("/\\") + ".edges"
+    crawl_edges(args.directory, path)
+    ranks = outofcore_pagerank(path, DAMPING)
+    print(f"PageRank Results from Out-of-Core Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def crawl_edges(directory, path):
+    """
+    Parse a directory of HTML pages like crawler.parallel_crawl, but write
+    the links to an edge list in the directory `path` instead of returning
+    them, holding only the page names in memory.
+    """
+    pages = sorted(html_files(directory))
+    write_edges(pages, (page_links(directory, page)[1] for page in pages), path)
+
+
+def write_edges(pages, links, path):
+    """
+    Write an edge list to the directory `path` for the sorted list `pages`,
+    where `links` yields the set of pages each page links to, in order.
+    Links to pages that are not in `pages` are left out.
+
+    The edge list has pages.txt, with one page name per line in sorted
+    order, and edges.npy, a NumPy array with a (destination, source) pair
+    of int32 page numbers per link, sorted by destination and then source.
+    """
+    os.makedirs(path, exist_ok=True)
+    index = {page: i for i, page in enumerate(pages)}
+    with open(os.path.join(path, "pages.txt"), "w") as f:
+        for page in pages:
+            f.write(page + "\n")
+
+    # Write links in crawl order (so by source), then sort them by destination
+    unsorted = os.path.join(path, "edges.tmp")
+    with open(unsorted, "wb") as f:
+        block = []
+        for source, targets in enumerate(links):
+            for link in sorted(targets):
+                if link in index:
+                    block.extend((index[link], source))
+            if len(block) >= 2 * BLOCK:
+                np.array(block, dtype=np.int32).tofile(f)
+                block = []
+        np.array(block, dtype=np.int32).tofile(f)
+    count = sort_by_destination(unsorted, os.path.join(path, "edges.npy"), len(pages))
+    os.remove(unsorted)
+
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"version": VERSION, "pages": len(pages), "edges": count}, f)
+
+
+def sort_by_destination(unsorted, path, n):
+    """
+    Write the (destination, source) pairs in the file `unsorted`, which
+    are in order of source, to `path` in order of destination and then
+    source, one block at a time. Returns the number of pairs.
+    """
+    edges = _edges(unsorted)
+    counts = np.zeros(n, dtype=np.int64)
+    for start in range(0, len(edges), BLOCK):
+        counts += np.bincount(edges[start:start + BLOCK, 0], minlength=n)
+
+    # Next free position in the output for each destination
+    cursor = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    output = np.lib.format.open_memmap(path, mode="w+", dtype=np.int32, shape=(len(edges), 2))
+    for start in range(0, len(edges), BLOCK):
+        block = edges[start:start + BLOCK]
+        block = block[np.argsort(block[:, 0], kind="stable")]
+        destinations = block[:, 0]
+
+        # Position of each edge among the block's edges to the same destination
+        first = np.searchsorted(destinations, destinations)
+        output[cursor[destinations] + np.arange(len(block)) - first] = block
+        cursor += np.bincount(destinations, minlength=n)
+    output.flush()
+    return len(edges)
+
+
+def _edges(path):
+    """
+    Memory-map a file of int32 (destination, source) pairs.
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros((0, 2), dtype=np.int32)
+    return np.memmap(path, dtype=np.int32, mode="r").reshape(-1, 2)
+
+
+def load_edges(path):
+    """
+    Return (pages, edges) for the edge list in the directory `path`,
+    where `edges` is a read-only memory map of its (destination, source) pairs.
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["version"] != VERSION:
+        raise ValueError(f"{path} has an unsupported edge list version")
+    with open(os.path.join(path, "pages.txt")) as f:
+        pages = [line.rstrip("\n") for line in f]
+    if meta["edges"] == 0:
+        return pages, np.zeros((0, 2), dtype=np.int32)
+    return pages, np.load(os.path.join(path, "edges.npy"), mmap_mode="r")
+
+
+def outofcore_power_iteration(path, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return (pages, ranks, iterations) for the edge list in the directory
+    `path`, like matrix.power_iteration, streaming the memory-mapped edges
+    one block at a time in every iteration so only rank vectors stay in
+    memory.
+
+    Iteration stops once the ranks change by at most `tolerance` in total
+    (L1 norm), or after `max_iterations`.
+    """
+    pages, edges = load_edges(path)
+    n = len(pages)
+    counts = np.zeros(n, dtype=np.int64)
+    for start in range(0, len(edges), BLOCK):
+        counts += np.bincount(edges[start:start + BLOCK, 1], minlength=n)
+
+    # A page with no links is treated as linking to every page
+    dangling = counts == 0
+    shares = np.divide(1, counts, out=np.zeros(n), where=~dangling)
+
+    ranks = np.full(n, 1 / n)
+    for iteration in range(1, max_iterations + 1):
+        weights = ranks * shares
+        spread = ranks[dangling].sum() / n
+        new_ranks = np.zeros(n)
+        for start in range(0, len(edges), BLOCK):
+            # Edges are sorted by destination, so a block only touches a slice of the ranks
+            block = edges[start:start + BLOCK]
+            first, last = block[0, 0], block[-1, 0]
+            new_ranks[first:last + 1] += np.bincount(block[:, 0] - first, weights=weights[block[:, 1]],
+                                                     minlength=last - first + 1)
+        new_ranks = (1 - damping_factor) / n + damping_factor * (new_ranks + spread)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change <= tolerance:
+            break
+    return pages, ranks / ranks.sum(), iteration
+
+
+def outofcore_pagerank(path, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for each page of the edge list in the directory
+    `path` by out-of-core power iteration.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    pages, ranks, _ = outofcore_power_iteration(path, damping_factor, tolerance, max_iterations)
+    return dict(zip(pages, ranks.tolist()))
+
+
+if __name__ == "__main__":
+    main()
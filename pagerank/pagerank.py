@@ -2,10 +2,17 @@ import os
 import random
 import re
 import sys
+import time
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Default convergence controls for iterate_pagerank
+TOLERANCE = 0.001
+MAX_ITERATIONS = 1000
+NORMS = ("inf", "l1")
+METHODS = ("jacobi", "gauss-seidel")
+
 
 def main():
     if len(sys.argv) != 2:
@@ -68,11 +75,11 @@ def transition_model(corpus, page, damping_factor):
     if numLinks == 0:
         for i in keys.keys():
             keys[i] = keys[i] + (damping_factor / len(corpus.keys()))
-            return keys
+        return keys
 
-    for i in keys:
+    for i in pageLinks:
         keys[i] = keys[i] + float((damping_factor / numLinks))
-    return keys   
+    return keys
 
 
 def sample_pagerank(corpus, damping_factor, n):
@@ -106,40 +113,123 @@ def sample_pagerank(corpus, damping_factor, n):
     return keys
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE, norm="inf", max_iterations=MAX_ITERATIONS,
+                     method="jacobi", extrapolate=0, telemetry=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    Iteration stops once the ranks change by at most `tolerance` between
+    iterations, measured by `norm`: "inf" for the largest change to any
+    page or "l1" for the total change, or after `max_iterations`.
+
+    `method` "jacobi" computes every page's new rank from the previous
+    iteration's ranks, while "gauss-seidel" uses each new rank as soon
+    as it is computed, which usually converges in fewer iterations.
+    If `extrapolate` is k > 0, every k-th iteration is followed by an
+    Aitken extrapolation from the last three iterations, as long as none
+    of those was itself extrapolated.
+
+    `telemetry`, if given, is called after each iteration with a dictionary
+    of: iteration, l1 and inf (the change in each norm), seconds (the time
+    the iteration took) and extrapolated.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    if norm not in NORMS:
+        raise ValueError(f"norm must be one of {', '.join(NORMS)}")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    if extrapolate < 0:
+        raise ValueError("extrapolate must not be negative")
+
+    n = len(corpus)
+    pages = list(corpus)
+
+    # Pages linking to each page, with the share of their rank each link carries
+    inbound = {page: [] for page in pages}
+    for page, links in corpus.items():
+        for link in links:
+            inbound[link].append((page, 1 / len(links)))
+
+    # A page with no links is treated as linking to every page
+    dangling = [page for page in pages if len(corpus[page]) == 0]
 
     keys = {}
-    for i in corpus.keys():
-        keys[i] = 1 / len(corpus.keys())
+    for i in pages:
+        keys[i] = 1 / n
+    history = []
+
+    for iteration in range(1, max_iterations + 1):
+        start = time.perf_counter()
+        previous = dict(keys)
+        dangling_rank = sum(keys[page] for page in dangling)
+
+        if method == "jacobi":
+            for i in pages:
+                rank = dangling_rank / n + sum(previous[page] * share for page, share in inbound[i])
+                keys[i] = (1 - damping_factor) / n + damping_factor * rank
+        else:
+            for i in pages:
+                rank = dangling_rank / n + sum(keys[page] * share for page, share in inbound[i])
+                new = (1 - damping_factor) / n + damping_factor * rank
+                if not corpus[i]:
+                    dangling_rank += new - keys[i]
+                keys[i] = new
+            _normalize(keys)
+
+        extrapolated = False
+        history = (history + [previous])[-2:]
+        if extrapolate and iteration % extrapolate == 0 and len(history) == 2:
+            extrapolated = _aitken(history[0], history[1], keys)
+
+            # The next extrapolation needs three plain iterations from this one
+            if extrapolated:
+                history = []
+
+        changes = [abs(keys[i] - previous[i]) for i in pages]
+        record = {
+            "iteration": iteration,
+            "l1": sum(changes),
+            "inf": max(changes, default=0),
+            "seconds": time.perf_counter() - start,
+            "extrapolated": extrapolated,
+        }
+        if telemetry is not None:
+            telemetry(record)
+        if record[norm] <= tolerance and not extrapolated:
+            break
 
-    condition = True
-    while condition:
-        tempKeys = {}
-        condition = False
+    return keys
 
-        for i in keys.keys():
-            temp = keys[i]
 
-            tempKeys[i] = (1 - damping_factor / len(corpus.keys()))
+def _aitken(oldest, older, keys):
+    """
+    Replace `keys` with the Aitken extrapolation of each page's rank from
+    three successive iterations, `oldest`, `older` and `keys`, keeping
+    the current rank where the extrapolation is undefined or negative.
+    Returns whether any rank was extrapolated.
+    """
+    extrapolated = False
+    for i in keys:
+        second = keys[i] - 2 * older[i] + oldest[i]
+        if abs(second) < 1e-15:
+            continue
+        value = keys[i] - (keys[i] - older[i]) ** 2 / second
+        if value > 0:
+            keys[i] = value
+            extrapolated = True
+    _normalize(keys)
+    return extrapolated
 
-            for page, link in corpus.items():
-                if i in link:
-                    tempKeys[i] = tempKeys[i] + (damping_factor * (keys[page] / len(link)))
 
-            if (temp-tempKeys[i] > 0.001):
-                condition = True 
+def _normalize(keys):
+    total = sum(keys.values())
+    for i in keys:
+        keys[i] = keys[i] / total
 
-        for i in keys.keys():
-            keys[i] = tempKeys[i]            
-    return keys
 
 if __name__ == "__main__":
     main()
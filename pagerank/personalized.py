@@ -0,0 +1,120 @@
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from matrix import MAX_ITERATIONS, TOLERANCE, LinkMatrix
+from pagerank import DAMPING, crawl
+
+# Most teleport sets whose ranks a PersonalizedRanks keeps
+CACHE_SIZE = 256
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus pages [pages ...]\n"
+                 "where each pages is a comma-separated list of pages to teleport to")
+    corpus = crawl(sys.argv[1])
+    teleports = [set(pages.split(",")) for pages in sys.argv[2:]]
+    for teleport, ranks in zip(teleports, PersonalizedRanks(corpus, DAMPING).ranks(teleports)):
+        print(f"PageRank Results Personalized to {', '.join(sorted(teleport))}")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+
+
+def teleport_key(teleport):
+    """
+    Returns a hashable key for a teleport set: either a collection of
+    pages, teleported to with equal chance, or a dictionary of weights.
+    Raises ValueError for a teleport set that gives no distribution.
+    """
+    if isinstance(teleport, dict):
+        total = sum(teleport.values())
+        if total <= 0 or min(teleport.values()) < 0:
+            raise ValueError("teleport weights must not be negative and must have a positive total")
+        return tuple(sorted((page, weight / total) for page, weight in teleport.items() if weight))
+    if not teleport:
+        raise ValueError("teleport set must not be empty")
+    return frozenset(teleport)
+
+
+def teleport_matrix(matrix, keys):
+    """
+    Returns an N x K array whose k-th column is the teleport distribution
+    over the LinkMatrix's pages for the k-th of `keys` (from teleport_key).
+    """
+    index = {page: i for i, page in enumerate(matrix.pages)}
+    teleports = np.zeros((len(matrix), len(keys)))
+    for k, key in enumerate(keys):
+        if isinstance(key, frozenset):
+            key = [(page, 1 / len(key)) for page in key]
+        for page, weight in key:
+            if page not in index:
+                raise ValueError(f"{page} is not in the corpus")
+            teleports[index[page], k] = weight
+    return teleports
+
+
+def personalized_power_iteration(matrix, teleports, damping_factor,
+                                 tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return (ranks, iterations) for the N x K array `teleports` of teleport
+    distributions, where the k-th column of `ranks` is the PageRank vector
+    of a random surfer who jumps according to the k-th teleport column.
+
+    Every column is stepped by the same sparse multiply. A surfer on a
+    page without links jumps according to its own teleport distribution.
+    Stops once every column changes by at most `tolerance` (L1 norm).
+    """
+    ranks = teleports.copy()
+    dangling = matrix.dangling
+    for iteration in range(1, max_iterations + 1):
+        jump = damping_factor * ranks[dangling].sum(axis=0) + (1 - damping_factor)
+        new_ranks = damping_factor * (matrix.links @ ranks) + teleports * jump
+        change = np.abs(new_ranks - ranks).sum(axis=0)
+        ranks = new_ranks
+        if change.max(initial=0) <= tolerance:
+            break
+    return ranks / ranks.sum(axis=0), iteration
+
+
+class PersonalizedRanks():
+    """
+    Personalized PageRank for one corpus, solving many teleport sets with
+    a single batched power iteration and caching the ranks of each set.
+    """
+
+    def __init__(self, corpus, damping_factor, tolerance=TOLERANCE, cache_size=CACHE_SIZE):
+        self.matrix = LinkMatrix.from_corpus(corpus)
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def ranks(self, teleports):
+        """
+        Return a list with a dictionary of PageRank values for each of
+        `teleports`, each a collection of pages to teleport to with equal
+        chance or a dictionary of weights to teleport to pages with.
+        Teleport sets that are not cached are solved together.
+        """
+        keys = [teleport_key(teleport) for teleport in teleports]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.cache))
+        if missing:
+            columns, _ = personalized_power_iteration(
+                self.matrix, teleport_matrix(self.matrix, missing), self.damping_factor, self.tolerance
+            )
+            for k, key in enumerate(missing):
+                self.cache[key] = self.matrix.ranks_dict(columns[:, k])
+
+        results = []
+        for key in keys:
+            self.cache.move_to_end(key)
+            results.append(self.cache[key])
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import sys
+import time
+
+import numpy as np
+
+from matrix import LinkMatrix
+from pagerank import DAMPING, SAMPLES, crawl
+
+# Independent surfers advanced together by sample_ranks
+SURFERS = 1000
+
+# Uncounted steps each surfer takes first, so its random starting page is
+# forgotten: the start's influence shrinks by the damping factor each step,
+# and 0.85 ** 60 is below 1e-4
+BURN_IN = 60
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python sampler.py corpus [samples]")
+    corpus = crawl(sys.argv[1])
+    n = int(sys.argv[2]) if len(sys.argv) == 3 else SAMPLES
+    start = time.perf_counter()
+    ranks = vector_sample_pagerank(corpus, DAMPING, n, seed=0)
+    seconds = time.perf_counter() - start
+    print(f"PageRank Results from Vectorized Sampling (n = {n}, {n / seconds:.0f} samples/sec)")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class Surfers():
+    """
+    Random surfers moving over a LinkMatrix all at once.
+
+    Page j links to pages `targets[offsets[j]:offsets[j + 1]]`, so a link
+    is chosen uniformly at random in constant time by indexing that slice,
+    without building a distribution over every page as transition_model does.
+    """
+
+    def __init__(self, matrix, damping_factor, seed=None):
+        outgoing = matrix.links.tocsc()
+        outgoing.sort_indices()
+        self.offsets = outgoing.indptr
+        self.targets = outgoing.indices
+        self.counts = np.diff(self.offsets)
+        self.damping_factor = damping_factor
+        self.rng = np.random.default_rng(seed)
+
+    def start(self, surfers):
+        """
+        Returns `surfers` pages chosen uniformly at random.
+        """
+        return self.rng.integers(len(self.counts), size=surfers)
+
+    def step(self, pages):
+        """
+        Returns the next page of each surfer currently on `pages`.
+        Each follows a random link with probability `damping_factor`,
+        and otherwise (or if its page has no links) jumps to any page.
+        """
+        counts = self.counts[pages]
+        follow = (self.rng.random(len(pages)) < self.damping_factor) & (counts > 0)
+        jumps = self.rng.integers(len(self.counts), size=len(pages))
+
+        if len(self.targets) == 0:
+            return jumps
+        choices = (self.rng.random(len(pages)) * counts).astype(np.int64)
+        links = self.targets[np.minimum(self.offsets[pages] + choices, len(self.targets) - 1)]
+        return np.where(follow, links, jumps)
+
+
+def sample_ranks(matrix, damping_factor, n, surfers=SURFERS, seed=None, burn_in=BURN_IN):
+    """
+    Return a rank vector for a LinkMatrix estimated from `n` samples,
+    taken as `surfers` independent random surfers each starting on a
+    random page, taking `burn_in` steps that are not counted, and then
+    visiting about n / surfers pages.
+    """
+    surfers = max(1, min(surfers, n))
+    walkers = Surfers(matrix, damping_factor, seed)
+    visits = np.zeros(len(matrix), dtype=np.int64)
+    pages = walkers.start(surfers)
+    for _ in range(burn_in):
+        pages = walkers.step(pages)
+    remaining = n
+    while remaining > 0:
+        counted = pages[:remaining]
+        visits += np.bincount(counted, minlength=len(matrix))
+        remaining -= len(counted)
+        pages = walkers.step(pages)
+    return visits / n
+
+
+def vector_sample_pagerank(corpus, damping_factor, n, surfers=SURFERS, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    many random surfers at once, starting each on a page at random and
+    letting it walk BURN_IN steps before counting its visits.
+    The same `seed` always gives the same estimate.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    return matrix.ranks_dict(sample_ranks(matrix, damping_factor, n, surfers, seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from matrix import MAX_ITERATIONS, TOLERANCE, LinkMatrix
+from pagerank import DAMPING, crawl
+
+# Pages whose new ranks are computed by one task
+CHUNK_PAGES = 1 << 15
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank a corpus with multi-threaded power iteration.")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    ranks = threaded_pagerank(crawl(args.directory), DAMPING, args.workers)
+    print(f"PageRank Results from Threaded Iteration ({args.workers} workers)")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def chunk_bounds(n, chunk_pages=CHUNK_PAGES):
+    """
+    Returns (start, stop) bounds splitting `n` pages into chunks.
+    """
+    return [(start, min(start + chunk_pages, n)) for start in range(0, n, chunk_pages)]
+
+
+def threaded_power_iteration(matrix, damping_factor, workers=1, tolerance=TOLERANCE,
+                             max_iterations=MAX_ITERATIONS, chunk_pages=CHUNK_PAGES):
+    """
+    Return (ranks, iterations) like matrix.power_iteration, with each
+    iteration split into chunks of pages whose new ranks are computed
+    by a pool of `workers` threads. SciPy and NumPy release the GIL
+    during the sparse multiply, so chunks run on separate cores.
+
+    Chunks depend only on `chunk_pages`, never on `workers`, and their
+    partial sums are added up in chunk order, so the result is exactly
+    the same for any number of workers.
+    """
+    n = len(matrix)
+    bounds = chunk_bounds(n, chunk_pages)
+    rows = [matrix.links[start:stop] for start, stop in bounds]
+    dangling = matrix.dangling
+
+    ranks = np.full(n, 1 / n)
+    new_ranks = np.empty(n)
+
+    def dangling_rank(chunk):
+        start, stop = bounds[chunk]
+        return ranks[start:stop][dangling[start:stop]].sum()
+
+    def step(chunk, spread):
+        start, stop = bounds[chunk]
+        new_ranks[start:stop] = (1 - damping_factor) / n + damping_factor * (rows[chunk] @ ranks + spread)
+        return np.abs(new_ranks[start:stop] - ranks[start:stop]).sum()
+
+    with ThreadPoolExecutor(workers) as pool:
+        for iteration in range(1, max_iterations + 1):
+            spread = sum(pool.map(dangling_rank, range(len(bounds)))) / n
+            change = sum(pool.map(step, range(len(bounds)), [spread] * len(bounds)))
+            ranks, new_ranks = new_ranks, ranks
+            if change <= tolerance:
+                break
+    return ranks / ranks.sum(), iteration
+
+
+def threaded_pagerank(corpus, damping_factor, workers=1):
+    """
+    Return PageRank values for each page by power iteration split
+    across `workers` threads.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, _ = threaded_power_iteration(matrix, damping_factor, workers)
+    return matrix.ranks_dict(ranks)
+
+
+if __name__ == "__main__":
+    main()